@@ -0,0 +1,130 @@
+"""Admission control for the API.
+
+Requests are sorted into route classes (public submissions, chunked file
+uploads, public reads, admin) and each class gets its own concurrency limit
+and bounded FIFO wait queue. A request that finds the queue full, or waits longer than the class
+deadline, is turned away at once with 503 + Retry-After instead of adding to
+everyone's latency. Admin traffic has its own slots, so a public surge cannot
+starve it, and health/readiness probes bypass admission entirely.
+"""
+import asyncio
+import json
+from collections import deque
+
+BYPASS_PATHS = {"/api/", "/api/health", "/api/ready", "/api/admin/events"}
+SUBMISSION_PATHS = ("/api/register-student", "/api/submit-partnership")
+UPLOAD_PATHS = ("/api/uploads",)
+ADMIN_PATHS = ("/api/admin/", "/api/registrations", "/api/partnerships", "/api/gallery/upload")
+
+
+def classify(scope) -> str:
+    """Route class for a request, or None to bypass admission"""
+    path, method = scope["path"], scope["method"]
+    # The event stream is long-lived and would pin an admin slot for hours
+    if path in BYPASS_PATHS or method == "OPTIONS":
+        return None
+    if path.startswith(ADMIN_PATHS) or (method == "DELETE" and path.startswith("/api/gallery/")):
+        return "admin"
+    # Chunk uploads hold a slot for a whole (possibly slow, mobile) body transfer,
+    # so they get their own slots rather than starving form submissions
+    if method != "GET" and path.startswith(UPLOAD_PATHS):
+        return "upload"
+    if method != "GET" and path.startswith(SUBMISSION_PATHS):
+        return "submission"
+    return "public_read"
+
+
+class Rejected(Exception):
+    pass
+
+
+class Limiter:
+    def __init__(self, limit: int, queue_size: int, max_wait: float):
+        self.limit = limit
+        self.queue_size = queue_size
+        self.max_wait = max_wait
+        self.active = 0
+        self.waiting = deque()
+        self.admitted = 0
+        self.rejected_queue_full = 0
+        self.rejected_deadline = 0
+        self.max_queued = 0
+
+    async def acquire(self):
+        if self.active < self.limit and not self.waiting:
+            self.active += 1
+            self.admitted += 1
+            return
+        if len(self.waiting) >= self.queue_size:
+            self.rejected_queue_full += 1
+            raise Rejected("queue full")
+        slot = asyncio.get_running_loop().create_future()
+        self.waiting.append(slot)
+        self.max_queued = max(self.max_queued, len(self.waiting))
+        try:
+            await asyncio.wait_for(asyncio.shield(slot), self.max_wait)
+        except asyncio.TimeoutError:
+            if slot.done():
+                # Handed a slot just as the deadline passed; pass it on
+                self.release()
+            else:
+                self.waiting.remove(slot)
+                slot.cancel()
+            self.rejected_deadline += 1
+            raise Rejected("deadline exceeded")
+        except asyncio.CancelledError:
+            if slot.done() and not slot.cancelled():
+                self.release()
+            elif slot in self.waiting:
+                self.waiting.remove(slot)
+            raise
+        self.admitted += 1
+
+    def release(self):
+        # Hand the slot straight to the next waiter so newcomers cannot jump the queue
+        while self.waiting:
+            slot = self.waiting.popleft()
+            if not slot.done():
+                slot.set_result(None)
+                return
+        self.active -= 1
+
+    def snapshot(self) -> dict:
+        return {
+            "limit": self.limit, "active": self.active, "queued": len(self.waiting),
+            "max_queued": self.max_queued, "queue_size": self.queue_size, "max_wait_seconds": self.max_wait,
+            "admitted": self.admitted, "rejected_queue_full": self.rejected_queue_full,
+            "rejected_deadline": self.rejected_deadline,
+        }
+
+
+class AdmissionMiddleware:
+    def __init__(self, app, limiters: dict):
+        self.app = app
+        self.limiters = limiters
+
+    async def __call__(self, scope, receive, send):
+        route_class = classify(scope) if scope["type"] == "http" else None
+        limiter = self.limiters.get(route_class)
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await limiter.acquire()
+        except Rejected as e:
+            await self.reject(send, route_class, str(e))
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
+
+    async def reject(self, send, route_class: str, reason: str):
+        body = json.dumps({"detail": "Server is busy, please retry shortly", "reason": reason}).encode()
+        await send({"type": "http.response.start", "status": 503, "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", b"1"),
+            (b"x-admission-class", route_class.encode()),
+        ]})
+        await send({"type": "http.response.body", "body": body})
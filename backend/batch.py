@@ -0,0 +1,84 @@
+"""Several admin GET endpoints in one round trip (POST /api/admin/batch).
+
+The batch request is authenticated once; each query then calls the endpoint's
+handler directly, all concurrently, with a copy of the batch request stripped
+of Accept-Encoding so cached JSON payloads come back uncompressed and can be
+spliced into the combined body as is. The combined response is compressed by
+CompressionMiddleware like any other.
+"""
+import asyncio
+import inspect
+import json
+import logging
+
+from fastapi import HTTPException, Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+# Sub-response headers passed back to the client per query
+FORWARDED_HEADERS = ("etag", "x-sync-cursor", "retry-after")
+
+
+class BatchRoute:
+    def __init__(self, handler, params: tuple = ()):
+        self.handler = handler
+        self.params = params
+        self.accepts = set(inspect.signature(handler).parameters)
+
+
+def sub_request(request: Request, path: str, if_none_match: str = None) -> Request:
+    headers = [(k, v) for k, v in request.scope["headers"] if k not in (b"accept-encoding", b"if-none-match", b"content-length")]
+    if if_none_match:
+        headers.append((b"if-none-match", if_none_match.encode("latin-1")))
+    scope = {**request.scope, "method": "GET", "path": path, "raw_path": path.encode(), "query_string": b"", "headers": headers}
+    return Request(scope, request.receive)
+
+
+def encode_result(query_id: str, status_code: int, headers: dict, body: bytes) -> bytes:
+    """One result object, with the already-serialised JSON body spliced in"""
+    meta = json.dumps({"id": query_id, "status": status_code, "headers": headers}, separators=(",", ":"))
+    return meta[:-1].encode() + b',"body":' + (body or b"null") + b"}"
+
+
+async def run_query(route: BatchRoute, request: Request, query, context: dict) -> bytes:
+    unknown = set(query.params) - set(route.params)
+    if unknown:
+        detail = json.dumps({"detail": f"Unsupported parameters: {', '.join(sorted(unknown))}"}).encode()
+        return encode_result(query.id, 422, {}, detail)
+
+    response = Response()
+    kwargs = {name: value for name, value in context.items() if name in route.accepts}
+    kwargs.update(query.params, request=sub_request(request, query.path, query.if_none_match))
+    if "response" in route.accepts:
+        kwargs["response"] = response
+    try:
+        with tracer.start_as_current_span("batch.query", attributes={"path": query.path}):
+            result = await route.handler(**kwargs)
+    except HTTPException as e:
+        headers = {k.lower(): v for k, v in (e.headers or {}).items() if k.lower() in FORWARDED_HEADERS}
+        return encode_result(query.id, e.status_code, headers, json.dumps({"detail": e.detail}).encode())
+    except Exception as e:
+        logger.error("Batch query %s failed: %s", query.path, e)
+        return encode_result(query.id, 500, {}, b'{"detail":"Internal server error"}')
+
+    if isinstance(result, Response):
+        response, body = result, result.body if result.status_code != 304 else b""
+    else:
+        body = json.dumps(jsonable_encoder(result), separators=(",", ":")).encode()
+    headers = {k: v for k, v in response.headers.items() if k in FORWARDED_HEADERS}
+    return encode_result(query.id, response.status_code, headers, body)
+
+
+async def execute(request: Request, queries: list, routes: dict, context: dict) -> Response:
+    """Run every query concurrently; results come back in request order"""
+    async def run(query):
+        route = routes.get(query.path)
+        if route is None:
+            return encode_result(query.id, 404, {}, b'{"detail":"Not Found"}')
+        return await run_query(route, request, query, context)
+
+    results = await asyncio.gather(*(run(query) for query in queries))
+    return Response(b'{"results":[' + b",".join(results) + b"]}", media_type="application/json")
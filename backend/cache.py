@@ -0,0 +1,85 @@
+"""In-process caches for hot read endpoints."""
+import asyncio
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+class TTLCache:
+    """Small LRU cache whose entries expire after `ttl` seconds"""
+
+    def __init__(self, ttl: float, maxsize: int = 1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        # Bumped on every invalidation; a value read before the bump must not be cached
+        self.version = 0
+
+    def get(self, key, default=None):
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            return default
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key, value, version=None):
+        """Store `value`; pass the `version` seen before loading it to drop stale writes"""
+        if version is not None and version != self.version:
+            return
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        self.version += 1
+        for key in keys:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self.version += 1
+        self._entries.clear()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one in-flight call.
+
+    Callers that arrive while a call for their key is running wait for it and
+    share its result (or exception) instead of issuing their own. Metrics are
+    kept per `metric` name, which defaults to the key; pass a shared name when
+    keys are unbounded (e.g. one per email address).
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._stats = {}
+
+    async def do(self, key, fn, metric=None):
+        stats = self._stats.setdefault(metric or key, {"calls": 0, "executions": 0})
+        stats["calls"] += 1
+        future = self._inflight.get(key)
+        if future is None:
+            stats["executions"] += 1
+            future = asyncio.ensure_future(fn())
+            self._inflight[key] = future
+            future.add_done_callback(lambda f: self._finished(key, f))
+        # A waiter going away (client disconnect) must not cancel the shared call
+        return await asyncio.shield(future)
+
+    def _finished(self, key, future):
+        self._inflight.pop(key, None)
+        if not future.cancelled():
+            # Mark the exception retrieved even if every waiter was cancelled
+            future.exception()
+
+    def snapshot(self) -> dict:
+        return {
+            name: {**stats, "coalesced": stats["calls"] - stats["executions"],
+                   "coalescing_ratio": round(1 - stats["executions"] / stats["calls"], 3)}
+            for name, stats in self._stats.items()
+        }
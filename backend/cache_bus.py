@@ -0,0 +1,101 @@
+"""Cross-worker cache invalidation over a Mongo capped collection.
+
+Each uvicorn worker keeps its own in-process caches. A write evicts the
+affected keys locally and appends a message to the `cache_invalidations`
+capped collection; every worker tails that collection and evicts the same
+keys, so no worker serves stale data for longer than the tail latency.
+
+A message is {"v": 1, "worker": ..., "evict": {cache name: [keys]}, "ts": ...}
+where an empty key list means the whole cache. A worker that sees a schema
+version `v` it does not understand clears the named caches rather than guessing.
+Evictions are idempotent, so replaying a few messages after a reconnect is
+harmless; anything that may have been missed while disconnected is handled by
+clearing every registered cache before tailing again.
+"""
+import asyncio
+import logging
+import os
+import time
+import uuid
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+from reconnect import reconnect_forever
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_VERSION = 1
+COLLECTION = "cache_invalidations"
+CAPPED_SIZE_BYTES = 1024 * 1024
+# Re-read messages this far back on (re)connect to cover clock skew between workers
+REPLAY_SECONDS = 5
+
+
+class InvalidationBus:
+    def __init__(self, get_db):
+        self.get_db = get_db
+        self.caches = {}
+        self.worker_id = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.received = 0
+        # Set after the first connection; later ones may have missed messages
+        self.reconnecting = False
+
+    def register(self, name: str, cache):
+        self.caches[name] = cache
+
+    async def publish(self, evict: dict):
+        """Evict {cache name: [keys]} here and in every other worker; [] evicts everything"""
+        for name, keys in evict.items():
+            self.apply(name, keys)
+        try:
+            await self.get_db()[COLLECTION].insert_one({
+                "v": MESSAGE_VERSION, "worker": self.worker_id, "evict": evict, "ts": time.time(),
+            })
+        except Exception as e:
+            # The local eviction already happened; other workers fall back to TTL expiry
+            logger.warning("Could not publish invalidation for %s: %s", ", ".join(evict), e)
+
+    def apply(self, name: str, keys: list):
+        cache = self.caches.get(name)
+        if cache is None:
+            return
+        if keys:
+            cache.invalidate(*keys)
+        else:
+            cache.clear()
+
+    def handle(self, message: dict):
+        if message.get("worker") == self.worker_id:
+            return
+        self.received += 1
+        for name, keys in (message.get("evict") or {}).items():
+            self.apply(name, keys if message.get("v") == MESSAGE_VERSION else [])
+
+    async def ensure_collection(self):
+        try:
+            await self.get_db().create_collection(COLLECTION, capped=True, size=CAPPED_SIZE_BYTES)
+        except CollectionInvalid:
+            pass
+
+    async def run(self):
+        """Tail the invalidation log until cancelled"""
+        await reconnect_forever(self.tail, "Cache invalidation tail")
+
+    async def tail(self, connected):
+        await self.ensure_collection()
+        collection = self.get_db()[COLLECTION]
+        # A tailable cursor on an empty capped collection dies immediately
+        if await collection.estimated_document_count() == 0:
+            await collection.insert_one({"v": MESSAGE_VERSION, "worker": self.worker_id, "evict": {}, "ts": time.time()})
+        if self.reconnecting:
+            for cache in self.caches.values():
+                cache.clear()
+        self.reconnecting = True
+        cursor = collection.find({"ts": {"$gte": time.time() - REPLAY_SECONDS}},
+                                 cursor_type=CursorType.TAILABLE_AWAIT)
+        connected()
+        while cursor.alive:
+            async for message in cursor:
+                self.handle(message)
+            await asyncio.sleep(0.1)
@@ -0,0 +1,153 @@
+"""Response compression.
+
+CompressionMiddleware compresses compressible single-body responses above a
+size threshold with brotli or gzip, whichever the client's Accept-Encoding
+prefers (brotli wins ties). Streaming responses such as the admin event
+stream, responses that already carry a Content-Encoding and HEAD requests are
+passed through untouched.
+
+JsonPayload is for cached responses: the JSON is serialised once and
+compressed once per encoding when the cache entry is built, so a cache hit
+costs no serialisation or compression at all.
+"""
+import gzip
+import json
+import os
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSION_MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+GZIP_LEVEL = 6
+# Per-request compression favours speed; cached payloads are compressed once, so go for size
+BROTLI_QUALITY = 4
+CACHED_BROTLI_QUALITY = 11
+# Besides these, any text/* type (except event streams) and any +json/+xml type (e.g. image/svg+xml)
+COMPRESSIBLE_TYPES = {"application/json", "application/javascript", "application/xml"}
+
+
+def is_compressible(content_type: str) -> bool:
+    media_type = content_type.partition(";")[0].strip().lower()
+    if media_type.startswith("text/"):
+        return media_type != "text/event-stream"
+    return media_type in COMPRESSIBLE_TYPES or media_type.endswith(("+json", "+xml"))
+
+
+def supported_encodings() -> list:
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+
+def accepted_encodings(accept_encoding: str, candidates: list = None) -> list:
+    """The `candidates` (default: those we can produce) an Accept-Encoding header allows, most preferred first"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    candidates = supported_encodings() if candidates is None else candidates
+    ranked = [(weights.get(encoding, weights.get("*", 0.0)), -i, encoding) for i, encoding in enumerate(candidates)]
+    # Ties go to the earlier candidate
+    return [encoding for q, _, encoding in sorted(ranked, reverse=True) if q > 0]
+
+
+def negotiate(accept_encoding: str):
+    """Pick the best supported encoding from an Accept-Encoding header, or None"""
+    accepted = accepted_encodings(accept_encoding)
+    return accepted[0] if accepted else None
+
+
+def compress(body: bytes, encoding: str, brotli_quality: int = BROTLI_QUALITY) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=GZIP_LEVEL)
+
+
+class JsonPayload:
+    """A JSON response body serialised and compressed ahead of time"""
+
+    def __init__(self, content):
+        self.body = json.dumps(jsonable_encoder(content), separators=(",", ":")).encode()
+        self.encoded = {}
+
+    def precompress(self):
+        """CPU-bound; run it in a worker thread"""
+        if len(self.body) >= COMPRESSION_MIN_BYTES:
+            for encoding in supported_encodings():
+                self.encoded[encoding] = compress(self.body, encoding, CACHED_BROTLI_QUALITY)
+        return self
+
+    def response(self, accept_encoding: str) -> Response:
+        encoding = negotiate(accept_encoding)
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding in self.encoded:
+            headers["Content-Encoding"] = encoding
+            return Response(self.encoded[encoding], media_type="application/json", headers=headers)
+        return Response(self.body, media_type="application/json", headers=headers)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESSION_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        # HEAD bodies are empty, so compressing one would only rewrite Content-Length to 0
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        accept = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"accept-encoding"), "")
+        encoding = negotiate(accept)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+        passthrough = False
+
+        async def send_compressed(message):
+            nonlocal start, passthrough
+            if message["type"] == "http.response.start":
+                headers = {k.lower(): v for k, v in message.get("headers", [])}
+                content_type = headers.get(b"content-type", b"").decode("latin-1")
+                if b"content-encoding" in headers or not is_compressible(content_type):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            if passthrough:
+                await send(message)
+                return
+
+            if message.get("more_body"):
+                # A streamed body; send it as is rather than buffering it
+                passthrough = True
+                await send(start)
+                await send(message)
+                return
+            body = message.get("body", b"")
+            headers = [(k, v) for k, v in start.get("headers", []) if k.lower() != b"content-length"]
+            vary = next((v for k, v in headers if k.lower() == b"vary"), None)
+            if vary is None:
+                headers.append((b"vary", b"Accept-Encoding"))
+            elif b"accept-encoding" not in vary.lower():
+                headers = [(k, v + b", Accept-Encoding" if k.lower() == b"vary" else v) for k, v in headers]
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                headers.append((b"content-encoding", encoding.encode()))
+            headers.append((b"content-length", str(len(body)).encode()))
+            await send({**start, "headers": headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
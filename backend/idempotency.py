@@ -0,0 +1,138 @@
+"""Idempotency-Key support for submission endpoints.
+
+A request carrying an `Idempotency-Key` header claims that key in the
+`idempotency_keys` collection before running. The response (including
+client errors such as "already registered") is stored against the key, and
+retries with the same key get it back verbatim with `Idempotent-Replayed: true`,
+without re-running uploads or inserts. A duplicate that arrives while the
+first request is still running waits for it. Records expire through a TTL
+index on `expires_at`.
+"""
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone, timedelta
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from pymongo.errors import DuplicateKeyError
+from starlette.datastructures import UploadFile
+
+logger = logging.getLogger(__name__)
+
+COLLECTION = "idempotency_keys"
+MAX_KEY_LENGTH = 255
+POLL_SECONDS = 0.2
+# Client errors worth retrying are not stored as the key's outcome
+TRANSIENT_STATUSES = {408, 409, 425, 429, 499}
+
+
+async def request_fingerprint(request) -> str:
+    """Hash of the form fields, so a key reused for a different submission is rejected"""
+    form = await request.form()
+    fields = sorted(
+        (name, [value.filename, value.size] if isinstance(value, UploadFile) else value)
+        for name, value in form.multi_items()
+    )
+    return hashlib.sha256(json.dumps(fields).encode()).hexdigest()
+
+
+def replay(record: dict) -> JSONResponse:
+    return JSONResponse(record["body"], status_code=record["status_code"],
+                        headers={"Idempotent-Replayed": "true"})
+
+
+class IdempotencyStore:
+    def __init__(self, get_db, ttl_hours: float, wait_seconds: float, lock_seconds: float):
+        self.get_db = get_db
+        self.ttl = timedelta(hours=ttl_hours)
+        self.wait_seconds = wait_seconds
+        self.lock = timedelta(seconds=lock_seconds)
+
+    @property
+    def collection(self):
+        return self.get_db()[COLLECTION]
+
+    async def claim(self, record_id: str, fingerprint: str):
+        """Return None if this request now owns the key, else the finished record to replay"""
+        now = datetime.now(timezone.utc)
+        try:
+            await self.collection.insert_one({
+                "_id": record_id, "fingerprint": fingerprint, "status": "pending",
+                "locked_until": now + self.lock, "created_at": now, "expires_at": now + self.ttl,
+            })
+            return None
+        except DuplicateKeyError:
+            pass
+
+        deadline = asyncio.get_running_loop().time() + self.wait_seconds
+        while True:
+            record = await self.collection.find_one({"_id": record_id})
+            if record is None:
+                # The owner failed and released the key; try to take it
+                return await self.claim(record_id, fingerprint)
+            if record["fingerprint"] != fingerprint:
+                raise HTTPException(status_code=422, detail="Idempotency-Key was already used for a different request")
+            if record["status"] == "done":
+                return record
+            now = datetime.now(timezone.utc)
+            # The owner died mid-request; take over its claim
+            taken = await self.collection.find_one_and_update(
+                {"_id": record_id, "status": "pending", "locked_until": {"$lt": now}},
+                {"$set": {"locked_until": now + self.lock}},
+            )
+            if taken is not None:
+                return None
+            if asyncio.get_running_loop().time() > deadline:
+                raise HTTPException(status_code=409, detail="A request with this Idempotency-Key is still in progress",
+                                    headers={"Retry-After": "1"})
+            await asyncio.sleep(POLL_SECONDS)
+
+    async def complete(self, record_id: str, status_code: int, body):
+        await self.collection.update_one(
+            {"_id": record_id},
+            {"$set": {"status": "done", "status_code": status_code, "body": jsonable_encoder(body)}},
+        )
+
+    async def release(self, record_id: str):
+        await self.collection.delete_one({"_id": record_id, "status": "pending"})
+
+    def guard(self, scope: str):
+        """Decorator for endpoints taking `request: Request`; requests without the header run as usual"""
+        def decorator(endpoint):
+            @functools.wraps(endpoint)
+            async def wrapper(*args, **kwargs):
+                request = kwargs["request"]
+                key = request.headers.get("idempotency-key")
+                if not key:
+                    return await endpoint(*args, **kwargs)
+                if len(key) > MAX_KEY_LENGTH:
+                    raise HTTPException(status_code=400, detail="Idempotency-Key is too long")
+
+                record_id = f"{scope}:{key}"
+                record = await self.claim(record_id, await request_fingerprint(request))
+                if record is not None:
+                    return replay(record)
+                try:
+                    result = await endpoint(*args, **kwargs)
+                except HTTPException as e:
+                    if e.status_code < 500 and e.status_code not in TRANSIENT_STATUSES:
+                        # Deterministic rejections are part of the stored outcome
+                        await self.complete(record_id, e.status_code, {"detail": e.detail})
+                    else:
+                        await self.release(record_id)
+                    raise
+                except BaseException:
+                    await self.release(record_id)
+                    raise
+                try:
+                    await self.complete(record_id, 200, result)
+                except Exception as e:
+                    # The submission went through; a retry after the lock expires would repeat it
+                    logger.error("Could not store idempotent response for %s: %s", record_id, e)
+                return result
+            return wrapper
+        return decorator
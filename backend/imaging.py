@@ -0,0 +1,144 @@
+"""Image processing for gallery uploads.
+
+Everything here is CPU-bound and runs inside the server's process pool, so the
+functions take and return plain bytes/dicts that pickle cheaply.
+"""
+import io
+import base64
+import multiprocessing
+from PIL import Image, ImageOps, features
+
+# Longest-edge bounds for the generated variants
+VARIANT_SIZES = {"thumbnail": 320, "medium": 960, "large": 1920}
+
+# Longest edge of the inline low-quality placeholder
+PLACEHOLDER_SIZE = 16
+
+ENCODER_OPTIONS = {
+    "webp": {"quality": 80, "method": 4},
+    "avif": {"quality": 55, "speed": 6},
+}
+
+
+def variant_formats() -> list:
+    """Modern formats this Pillow build can encode, preferred first"""
+    formats = ["avif"] if features.check("avif") else []
+    if features.check("webp"):
+        formats.append("webp")
+    return formats
+
+
+def pool_context():
+    """Start method for image worker processes.
+
+    Forked workers would inherit the parent's threads and locks (Mongo client,
+    logging queue, tracing exporter), so start them from a forkserver, or spawn
+    where that is unavailable.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+class InvalidImage(ValueError):
+    """The upload is not an image Pillow can decode"""
+
+
+def open_image(content: bytes) -> Image.Image:
+    """Decode an upload, apply its EXIF rotation and normalise the colour mode"""
+    try:
+        img = Image.open(io.BytesIO(content))
+        img.load()
+        img = ImageOps.exif_transpose(img)
+    except (OSError, SyntaxError, ValueError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e)) from e
+    if img.mode not in ("RGB", "RGBA"):
+        has_alpha = img.mode in ("LA", "PA") or "transparency" in img.info
+        img = img.convert("RGBA" if has_alpha else "RGB")
+    return img
+
+
+def dominant_color(img: Image.Image) -> str:
+    """Most common colour of a small quantised copy, as #rrggbb"""
+    sample = img.convert("RGB")
+    sample.thumbnail((64, 64))
+    quantised = sample.quantize(colors=5)
+    _, index = max(quantised.getcolors())
+    r, g, b = quantised.getpalette()[index * 3:index * 3 + 3]
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def placeholder_data_uri(img: Image.Image) -> str:
+    """Tiny blurred WebP preview, small enough to inline in JSON"""
+    tiny = img.convert("RGB")
+    tiny.thumbnail((PLACEHOLDER_SIZE, PLACEHOLDER_SIZE))
+    buffer = io.BytesIO()
+    tiny.save(buffer, format="WEBP", quality=30)
+    return "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode("ascii")
+
+
+def describe_image(content: bytes) -> dict:
+    """Dimensions, dominant colour and LQIP placeholder for an image"""
+    return image_metadata(open_image(content))
+
+
+def image_metadata(img: Image.Image) -> dict:
+    return {
+        "width": img.width,
+        "height": img.height,
+        "dominant_color": dominant_color(img),
+        "placeholder": placeholder_data_uri(img),
+    }
+
+
+def process_gallery_image(content: bytes) -> tuple:
+    """Decode once and return (metadata, variants) for a gallery upload"""
+    img = open_image(content)
+    return image_metadata(img), resize_variants(img)
+
+
+def build_variants(content: bytes, sizes: dict = VARIANT_SIZES, formats: list = None) -> dict:
+    """Return {size_name: {format: encoded_bytes}} for an uploaded image"""
+    return resize_variants(open_image(content), sizes, formats)
+
+
+def resize_variants(img: Image.Image, sizes: dict = VARIANT_SIZES, formats: list = None) -> dict:
+    formats = formats or variant_formats()
+    smallest = min(sizes, key=sizes.get)
+    variants = {}
+    for name, bound in sizes.items():
+        if name != smallest and bound >= max(img.size):
+            # No point in a "large" copy of a small original
+            continue
+        resized = img.copy()
+        resized.thumbnail((bound, bound), Image.Resampling.LANCZOS)
+        variants[name] = {}
+        for fmt in formats:
+            buffer = io.BytesIO()
+            resized.save(buffer, format=fmt.upper(), **ENCODER_OPTIONS[fmt])
+            variants[name][fmt] = buffer.getvalue()
+    return variants
+
+
+# Widths generated for the static site's images (srcset `w` descriptors)
+SITE_IMAGE_WIDTHS = [320, 640, 960, 1280, 1920]
+
+
+def site_image_variants(content: bytes, widths: list = SITE_IMAGE_WIDTHS, formats: list = None) -> tuple:
+    """Decode once and return (metadata, {width: {format: encoded_bytes}}) for a site image.
+
+    Widths at or above the original are dropped in favour of one full-width
+    copy, so an image is never upscaled.
+    """
+    img = open_image(content)
+    formats = formats or variant_formats()
+    targets = [w for w in widths if w < img.width] + [min(img.width, max(widths))]
+    variants = {}
+    for width in targets:
+        resized = img if width == img.width else img.resize(
+            (width, round(img.height * width / img.width)), Image.Resampling.LANCZOS)
+        variants[width] = {}
+        for fmt in formats:
+            buffer = io.BytesIO()
+            resized.save(buffer, format=fmt.upper(), **ENCODER_OPTIONS[fmt])
+            variants[width][fmt] = buffer.getvalue()
+    return image_metadata(img), variants
@@ -0,0 +1,116 @@
+"""Live admin activity feed.
+
+One change stream per process watches the admin-facing collections and fans
+each change out to every connected subscriber (the SSE endpoint), so open
+admin tabs cost one Mongo cursor in total instead of repeated dashboard
+queries. The watcher only runs while someone is subscribed. Change streams
+need a replica set (a single-node one is enough); on a standalone server the
+watcher logs a warning and keeps retrying.
+"""
+import asyncio
+import json
+import logging
+from contextlib import asynccontextmanager
+from datetime import datetime
+
+from reconnect import reconnect_forever
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+OPERATIONS = ["insert", "update", "replace", "delete"]
+# ChangeStreamHistoryLost, ChangeStreamFatalError
+HISTORY_LOST_CODES = {280, 286}
+
+
+def encode_event(event: dict) -> str:
+    """Render an event in text/event-stream framing"""
+    data = json.dumps(event, default=lambda v: v.isoformat() if isinstance(v, datetime) else str(v))
+    return f"event: {event['type']}\ndata: {data}\n\n"
+
+
+class ChangeFeed:
+    """Shares a single change stream across all subscribers.
+
+    `serializers` maps collection name -> callable turning a full document
+    into the JSON-able form the REST endpoints return; only those collections
+    are watched.
+    """
+
+    def __init__(self, get_db, serializers: dict):
+        self.get_db = get_db
+        self.serializers = serializers
+        self.subscribers = set()
+        self.resume_token = None
+        self._task = None
+
+    @asynccontextmanager
+    async def subscribe(self):
+        queue = asyncio.Queue(SUBSCRIBER_QUEUE_SIZE)
+        self.subscribers.add(queue)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._watch())
+        try:
+            yield queue
+        finally:
+            self.subscribers.discard(queue)
+            if not self.subscribers:
+                await self.close()
+
+    async def close(self):
+        task, self._task = self._task, None
+        if not self.subscribers:
+            # The next subscriber loads the lists afresh; resuming would replay what it already has
+            self.resume_token = None
+        if task is not None:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+
+    def publish(self, event: dict):
+        for queue in list(self.subscribers):
+            try:
+                queue.put_nowait(event)
+            except asyncio.QueueFull:
+                # A stalled client: drop its backlog and tell it to refetch
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait({"type": "resync"})
+
+    def to_event(self, change: dict) -> dict:
+        collection = change["ns"]["coll"]
+        event = {
+            "type": change["operationType"],
+            "collection": collection,
+            "key": str(change["documentKey"]["_id"]),
+        }
+        document = change.get("fullDocument")
+        if document is not None:
+            try:
+                event["document"] = self.serializers[collection](document)
+            except Exception as e:
+                logger.warning("Could not serialize %s change: %s", collection, e)
+        return event
+
+    async def _watch(self):
+        await reconnect_forever(self._follow, "Change stream", on_error=self._interrupted)
+
+    async def _follow(self, connected):
+        pipeline = [{"$match": {
+            "ns.coll": {"$in": list(self.serializers)},
+            "operationType": {"$in": OPERATIONS},
+        }}]
+        async with self.get_db().watch(pipeline, full_document="updateLookup",
+                                       resume_after=self.resume_token) as stream:
+            connected()
+            async for change in stream:
+                self.resume_token = stream.resume_token
+                self.publish(self.to_event(change))
+
+    def _interrupted(self, error: Exception):
+        if getattr(error, "code", None) in HISTORY_LOST_CODES:
+            # The resume point aged out of the oplog; changes were missed
+            self.resume_token = None
+            self.publish({"type": "resync"})
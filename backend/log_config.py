@@ -0,0 +1,186 @@
+"""Queue-based structured logging.
+
+Request handlers only put records on an in-memory queue; a QueueListener thread
+formats them and writes to stdout (and LOG_FILE if set), so slow disks or pipes
+never stall the event loop. Messages use %-style arguments, which are
+interpolated on the listener thread.
+
+LOG_FORMAT        json (default) or text
+LOG_LEVEL         root level, default INFO
+LOG_SAMPLE_RATES  comma-separated logger=rate pairs for INFO and below,
+                  e.g. "server.email=0.1" keeps one in ten email log lines
+
+uvicorn sets up its own loggers, with synchronous stdout handlers, before it
+imports the app; configure_logging() strips those handlers so access and error
+lines go through the queue as well. This relies on the app being imported by
+uvicorn (`uvicorn server:app`), which is how it is deployed.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import uuid
+from datetime import datetime, timezone
+
+from tracing import current_trace_id
+
+LOG_FORMAT = os.environ.get('LOG_FORMAT', 'json')
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'INFO')
+LOG_FILE = os.environ.get('LOG_FILE')
+LOG_SAMPLE_RATES = {
+    name.strip(): float(rate)
+    for name, _, rate in (pair.partition('=') for pair in os.environ.get('LOG_SAMPLE_RATES', '').split(',') if pair.strip())
+}
+LOG_QUEUE_SIZE = 10000
+# Loggers uvicorn configures with handlers of their own and propagate=False
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.error", "uvicorn.access")
+
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+# Attributes every LogRecord has, plus uvicorn's ANSI-coloured copy of the message;
+# anything else was passed through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "request_id", "trace_id", "color_message"}
+
+_listener = None
+_queue_handler = None
+
+
+class ContextFilter(logging.Filter):
+    """Stamps request and trace ids while still on the thread/task that logged"""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get() or "-"
+        record.trace_id = current_trace_id() or "-"
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of INFO/DEBUG records from high-volume loggers"""
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        if record.levelno > logging.INFO or not self.rates:
+            return True
+        name = record.name
+        while name:
+            if name in self.rates:
+                return random.random() < self.rates[name]
+            name = name.rpartition('.')[0]
+        return True
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that defers message interpolation to the listener thread"""
+
+    def prepare(self, record):
+        if record.exc_info:
+            # Tracebacks reference live frames; render them now
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Dropping a log line beats blocking a request
+            pass
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", "-"),
+            "trace_id": getattr(record, "trace_id", "-"),
+        }
+        entry.update({key: value for key, value in vars(record).items() if key not in _RECORD_ATTRS})
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def configure_logging():
+    """Route the root logger through a bounded queue to a background listener"""
+    global _listener, _queue_handler
+    if _listener is not None:
+        return
+    if LOG_FORMAT == 'json':
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - [%(request_id)s %(trace_id)s] %(message)s')
+    handlers = [logging.StreamHandler(sys.stdout)]
+    if LOG_FILE:
+        handlers.append(logging.FileHandler(LOG_FILE))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    _queue_handler = LazyQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    _queue_handler.addFilter(ContextFilter())
+    _queue_handler.addFilter(SamplingFilter(LOG_SAMPLE_RATES))
+    root = logging.getLogger()
+    root.handlers = [_queue_handler]
+    root.setLevel(LOG_LEVEL)
+    # One access line per request is the busiest log there is; keep it off the event loop too
+    for name in UVICORN_LOGGERS:
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread.
+
+    Runs at exit. Anything logged afterwards (late shutdown messages) is
+    written directly by the listener's handlers rather than queued for a
+    listener that is no longer running.
+    """
+    global _listener, _queue_handler
+    if _listener is None:
+        return
+    for handler in _listener.handlers:
+        for log_filter in _queue_handler.filters:
+            handler.addFilter(log_filter)
+    logging.getLogger().handlers = list(_listener.handlers)
+    _listener.stop()
+    _listener = _queue_handler = None
+
+
+class RequestIdMiddleware:
+    """Takes X-Request-ID from the client (or generates one) and echoes it back"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"x-request-id"), None)
+        request_id = (request_id or uuid.uuid4().hex)[:64]
+        token = request_id_var.set(request_id)
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id_var.reset(token)
@@ -0,0 +1,259 @@
+"""Maintenance commands for the WHIBC API.
+
+Usage: python manage.py <command> [options]
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import subprocess
+import sys
+import urllib.request
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path, PurePosixPath
+
+from pymongo import UpdateOne
+
+from log_config import configure_logging
+
+logger = logging.getLogger(__name__)
+
+REPO_DIR = Path(__file__).resolve().parent.parent
+IMAGE_ROOTS = [REPO_DIR / "images", REPO_DIR / "frontend" / "public" / "images"]
+IMAGE_SOURCE_SUFFIXES = {".jpg", ".jpeg", ".png"}
+OPTIMIZED_DIR = "optimized"
+PRECOMPRESS_SUFFIXES = {".html", ".js", ".css", ".json", ".svg", ".txt", ".map", ".xml", ".ico"}
+
+
+def fetch_image_bytes(path: str) -> bytes:
+    import server
+    if path.startswith(("http://", "https://")):
+        with urllib.request.urlopen(path, timeout=30) as response:
+            return response.read()
+    # Local uploads are stored by URL; read them back from the upload directory
+    local_prefix = server.LOCAL_UPLOAD_URL.rstrip("/") + "/"
+    if path.startswith(local_prefix):
+        return (server.LOCAL_UPLOAD_DIR / PurePosixPath(path[len(local_prefix):]).name).read_bytes()
+    return Path(path).read_bytes()
+
+
+async def backfill_gallery_metadata(batch_size: int, limit: int):
+    """Compute width/height, dominant colour and placeholder for gallery images missing them"""
+    import server
+    import imaging
+
+    query = {"width": None}
+    total = await server.db.gallery.count_documents(query)
+    if limit:
+        total = min(total, limit)
+    logger.info("Backfilling metadata for %s gallery images", total)
+    processed, failed, last_id = 0, 0, None
+    while processed + failed < total:
+        batch_query = dict(query, **({"_id": {"$gt": last_id}} if last_id else {}))
+        batch = await server.db.gallery.find(batch_query, {"id": 1, "path": 1}).sort("_id", 1).limit(batch_size).to_list(batch_size)
+        if not batch:
+            break
+        last_id = batch[-1]['_id']
+
+        async def describe(item):
+            content = await asyncio.to_thread(fetch_image_bytes, item['path'])
+            return await server.run_in_image_pool(imaging.describe_image, content)
+
+        results = await asyncio.gather(*(describe(item) for item in batch), return_exceptions=True)
+        updates = []
+        for item, result in zip(batch, results):
+            if isinstance(result, Exception):
+                failed += 1
+                logger.warning("Skipping gallery image %s: %s", item['id'], result)
+            else:
+                updates.append(UpdateOne({"_id": item['_id']}, {"$set": result}))
+        if updates:
+            await server.db.gallery.bulk_write(updates, ordered=False)
+        processed += len(updates)
+        logger.info("Gallery metadata: %s/%s updated, %s failed", processed, total, failed)
+
+
+async def migrate(batch_size: int, pause: float, list_only: bool):
+    """Apply pending data migrations, or list their status"""
+    import server
+    import migrations
+
+    if list_only:
+        for m in await migrations.migration_status(server.db):
+            print(f"{m['id']:<32} {m['status']:<8} {m['processed']:>8}  {m['description']}")
+        return
+    applied = await migrations.run_migrations(server.db, batch_size, pause)
+    logger.info("Applied migrations: %s", ', '.join(applied) or 'none')
+
+
+async def ensure_indexes():
+    import server
+    await server.ensure_indexes()
+    logger.info("Indexes ensured")
+
+
+def importtime_report(top: int):
+    """Import `server` under -X importtime and summarise its slowest direct imports"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import server"],
+        cwd=Path(__file__).parent, capture_output=True, text=True
+    )
+    entries = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        entries.append((depth, int(cumulative_us), name.strip()))
+    total = next((us for _, us, name in entries if name == "server"), 0)
+    print(f"server imported in {total / 1000:.1f} ms")
+    for _, us, name in sorted((e for e in entries if e[0] == 1), key=lambda e: -e[1])[:top]:
+        print(f"  {us / 1000:8.1f} ms  {name}")
+
+
+def precompress_static(directory: Path):
+    """Write .br/.gz siblings next to text assets for static_site.StaticSite to serve"""
+    import compression
+    written = 0
+    for path in sorted(directory.rglob("*")):
+        if not path.is_file() or path.suffix not in PRECOMPRESS_SUFFIXES:
+            continue
+        body = path.read_bytes()
+        if len(body) < compression.COMPRESSION_MIN_BYTES:
+            continue
+        for encoding, suffix in (("br", ".br"), ("gzip", ".gz")):
+            target = path.with_name(path.name + suffix)
+            if encoding not in compression.supported_encodings():
+                continue
+            if target.exists() and target.stat().st_mtime >= path.stat().st_mtime:
+                continue
+            target.write_bytes(compression.compress(body, encoding, compression.CACHED_BROTLI_QUALITY))
+            written += 1
+    logger.info("Precompressed %s files in %s", written, directory)
+
+
+def optimize_images(roots: list, url_prefix: str, workers: int, force: bool):
+    """Write resized WebP/AVIF copies of each root's photos plus a srcset manifest.
+
+    Outputs go to <root>/optimized/ and <root>/manifest.json. The manifest
+    records each source's SHA-256, so unchanged photos are skipped on the next
+    run unless the widths, formats or encoder settings change.
+    """
+    import imaging
+    settings = {"widths": imaging.SITE_IMAGE_WIDTHS, "formats": imaging.variant_formats(), "encoders": imaging.ENCODER_OPTIONS}
+    with ProcessPoolExecutor(max_workers=workers, mp_context=imaging.pool_context()) as pool:
+        for root in roots:
+            manifest_path = root / "manifest.json"
+            manifest = json.loads(manifest_path.read_text()) if manifest_path.exists() else {}
+            recorded = manifest.get("images", {})
+            previous = recorded if manifest.get("settings") == settings and not force else {}
+
+            images, pending = {}, {}
+            for source in sorted(root.rglob("*")):
+                relative = source.relative_to(root)
+                if source.suffix.lower() not in IMAGE_SOURCE_SUFFIXES or relative.parts[0] == OPTIMIZED_DIR:
+                    continue
+                content = source.read_bytes()
+                digest = hashlib.sha256(content).hexdigest()
+                entry = previous.get(relative.as_posix())
+                if entry and entry["sha256"] == digest and all((root / path).exists() for path in entry["files"]):
+                    images[relative.as_posix()] = entry
+                else:
+                    pending[relative.as_posix()] = (digest, pool.submit(imaging.site_image_variants, content))
+
+            for name, (digest, future) in pending.items():
+                try:
+                    metadata, variants = future.result()
+                except Exception as e:
+                    logger.warning("Skipping %s: %s", root / name, e)
+                    continue
+                images[name] = write_image_variants(root, url_prefix, name, digest, metadata, variants)
+
+            # Drop outputs of sources that were removed or renamed, and of old settings
+            keep = {path for entry in images.values() for path in entry["files"]}
+            for entry in recorded.values():
+                for path in entry["files"]:
+                    if path not in keep:
+                        (root / path).unlink(missing_ok=True)
+
+            manifest_path.write_text(json.dumps({"settings": settings, "images": images}, indent=2, sort_keys=True) + "\n")
+            logger.info("%s: %s images optimized, %s unchanged", root, len(pending), len(images) - len(pending))
+
+
+def write_image_variants(root: Path, url_prefix: str, name: str, digest: str, metadata: dict, variants: dict) -> dict:
+    files, urls = [], {}
+    for width, encoded in sorted(variants.items()):
+        for fmt, data in encoded.items():
+            # Keep the source suffix so a.jpg and a.png don't write the same files
+            path = Path(OPTIMIZED_DIR) / f"{name}-{width}.{fmt}"
+            (root / path).parent.mkdir(parents=True, exist_ok=True)
+            (root / path).write_bytes(data)
+            files.append(path.as_posix())
+            urls.setdefault(fmt, []).append((width, f"{url_prefix}/{path.as_posix()}"))
+    return {
+        "sha256": digest,
+        **metadata,
+        "files": files,
+        "srcset": {fmt: ", ".join(f"{url} {width}w" for width, url in entries) for fmt, entries in urls.items()},
+    }
+
+
+def run(command):
+    import server
+    server.connect_mongo()
+    try:
+        asyncio.run(command)
+    finally:
+        server.close_mongo()
+        server.shutdown_image_pool()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser("backfill-gallery-metadata", help="Compute image metadata for existing gallery entries")
+    backfill.add_argument("--batch-size", type=int, default=20)
+    backfill.add_argument("--limit", type=int, default=0, help="Stop after this many images (0 = all)")
+
+    migrate_cmd = commands.add_parser("migrate", help="Apply pending data migrations")
+    migrate_cmd.add_argument("--batch-size", type=int, default=None)
+    migrate_cmd.add_argument("--pause", type=float, default=None, help="Seconds to sleep between batches")
+    migrate_cmd.add_argument("--list", action="store_true", help="Show migration status and exit")
+
+    commands.add_parser("ensure-indexes", help="Create the indexes the API relies on")
+
+    optimize = commands.add_parser("optimize-images", help="Generate resized WebP/AVIF variants and a srcset manifest")
+    optimize.add_argument("roots", nargs="*", type=Path, default=IMAGE_ROOTS,
+                          help="Image directories (default: images/ and frontend/public/images/)")
+    optimize.add_argument("--url-prefix", default="/images", help="URL the roots are served under")
+    optimize.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    optimize.add_argument("--force", action="store_true", help="Re-encode even unchanged images")
+
+    precompress = commands.add_parser("precompress-static", help="Write .br/.gz copies of a built site's text assets")
+    precompress.add_argument("directory", type=Path, help="e.g. ../frontend/build")
+
+    importtime = commands.add_parser("importtime", help="Show the slowest imports at startup")
+    importtime.add_argument("--top", type=int, default=15)
+
+    args = parser.parse_args()
+    configure_logging()
+    if args.command == "backfill-gallery-metadata":
+        run(backfill_gallery_metadata(args.batch_size, args.limit))
+    elif args.command == "migrate":
+        import migrations
+        run(migrate(args.batch_size or migrations.MIGRATION_BATCH_SIZE,
+                    migrations.MIGRATION_BATCH_PAUSE if args.pause is None else args.pause, args.list))
+    elif args.command == "ensure-indexes":
+        run(ensure_indexes())
+    elif args.command == "optimize-images":
+        optimize_images(args.roots, args.url_prefix.rstrip("/"), args.workers, args.force)
+    elif args.command == "precompress-static":
+        precompress_static(args.directory)
+    elif args.command == "importtime":
+        importtime_report(args.top)
+
+
+if __name__ == "__main__":
+    main()
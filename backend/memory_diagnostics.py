@@ -0,0 +1,115 @@
+"""tracemalloc snapshots and process memory statistics for the admin API."""
+import gc
+import logging
+import resource
+import tracemalloc
+from collections import OrderedDict
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+MAX_SNAPSHOTS = 5
+GROUP_BY = ("lineno", "filename", "traceback")
+
+_snapshots = OrderedDict()
+
+# Allocations made by the diagnostics themselves are noise
+_NOISE_FILTERS = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+]
+
+
+def rss_bytes() -> int:
+    """Current resident set size; falls back to the peak where /proc isn't available"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def gc_stats() -> dict:
+    return {
+        "counts": gc.get_count(),
+        "thresholds": gc.get_threshold(),
+        "generations": gc.get_stats(),
+        "garbage": len(gc.garbage),
+    }
+
+
+def tracemalloc_status() -> dict:
+    if not tracemalloc.is_tracing():
+        return {"tracing": False, "snapshots": list(_snapshots)}
+    current, peak = tracemalloc.get_traced_memory()
+    return {
+        "tracing": True, "frames": tracemalloc.get_traceback_limit(),
+        "traced_bytes": current, "peak_traced_bytes": peak, "snapshots": list(_snapshots),
+    }
+
+
+def start(frames: int = 1):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+
+def stop():
+    tracemalloc.stop()
+
+
+def take_snapshot(name: str) -> tracemalloc.Snapshot:
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("tracemalloc is not running")
+    snapshot = tracemalloc.take_snapshot().filter_traces(_NOISE_FILTERS)
+    _snapshots.pop(name, None)
+    _snapshots[name] = snapshot
+    while len(_snapshots) > MAX_SNAPSHOTS:
+        _snapshots.popitem(last=False)
+    return snapshot
+
+
+def get_snapshot(name: str) -> Optional[tracemalloc.Snapshot]:
+    return _snapshots.get(name)
+
+
+def _location(stat) -> str:
+    return " <- ".join(f"{frame.filename}:{frame.lineno}" for frame in stat.traceback)
+
+
+def top_stats(snapshot: tracemalloc.Snapshot, group_by: str = "lineno", limit: int = 25) -> list:
+    return [
+        {"location": _location(stat), "size_bytes": stat.size, "count": stat.count}
+        for stat in snapshot.statistics(group_by)[:limit]
+    ]
+
+
+def diff(base: tracemalloc.Snapshot, target: tracemalloc.Snapshot, group_by: str = "lineno", limit: int = 25) -> list:
+    return [
+        {"location": _location(stat), "size_bytes": stat.size, "size_diff_bytes": stat.size_diff,
+         "count": stat.count, "count_diff": stat.count_diff}
+        for stat in target.compare_to(base, group_by)[:limit]
+    ]
+
+
+def object_counts(classes) -> dict:
+    """Live instances of each class, found by walking the GC-tracked objects"""
+    wanted = {cls: 0 for cls in classes}
+    for obj in gc.get_objects():
+        cls = type(obj)
+        if cls in wanted:
+            wanted[cls] += 1
+    return {cls.__name__: count for cls, count in wanted.items()}
+
+
+def log_memory_stats():
+    counts = gc.get_count()
+    collections = [generation["collections"] for generation in gc.get_stats()]
+    logger.info(
+        "Memory: rss %.1f MiB, gc counts %s, gc collections %s, uncollectable %d",
+        rss_bytes() / (1024 * 1024), counts, collections, len(gc.garbage)
+    )
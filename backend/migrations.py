@@ -0,0 +1,213 @@
+"""Data migrations for the WHIBC database.
+
+Migrations are registered in order with @migration and recorded in the
+`schema_migrations` collection. Data migrations walk collections in small
+`_id`-ordered batches through MigrationContext.batched_update, which saves a
+checkpoint after every batch (so an interrupted run resumes where it stopped)
+and pauses between batches so a backfill never saturates the database.
+
+A lock document in `migration_locks` ensures only one process runs migrations
+at a time; run them with `python manage.py migrate`, or at startup with
+RUN_MIGRATIONS_ON_STARTUP=1.
+"""
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+import sync
+
+logger = logging.getLogger(__name__)
+
+MIGRATION_BATCH_SIZE = int(os.environ.get('MIGRATION_BATCH_SIZE', 500))
+MIGRATION_BATCH_PAUSE = float(os.environ.get('MIGRATION_BATCH_PAUSE', 0.2))
+MIGRATION_LOCK_SECONDS = 60
+
+MIGRATIONS = []
+
+
+class MigrationLockLost(Exception):
+    pass
+
+
+def migration(migration_id: str, description: str):
+    """Register a migration; they run in registration order"""
+    def register(fn):
+        MIGRATIONS.append({"id": migration_id, "description": description, "run": fn})
+        return fn
+    return register
+
+
+class MigrationLock:
+    """Expiring lock document so only one worker runs migrations"""
+
+    def __init__(self, db, name: str = "migrations"):
+        self.db = db
+        self.name = name
+        self.owner = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+    async def acquire(self) -> bool:
+        now = datetime.now(timezone.utc)
+        try:
+            await self.db.migration_locks.find_one_and_update(
+                {"_id": self.name, "$or": [{"expires_at": {"$lt": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=MIGRATION_LOCK_SECONDS)}},
+                upsert=True
+            )
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def renew(self):
+        result = await self.db.migration_locks.update_one(
+            {"_id": self.name, "owner": self.owner},
+            {"$set": {"expires_at": datetime.now(timezone.utc) + timedelta(seconds=MIGRATION_LOCK_SECONDS)}}
+        )
+        if result.matched_count == 0:
+            raise MigrationLockLost(f"Migration lock taken over from {self.owner}")
+
+    async def release(self):
+        await self.db.migration_locks.delete_one({"_id": self.name, "owner": self.owner})
+
+
+class MigrationContext:
+    def __init__(self, db, migration_id: str, lock: MigrationLock, checkpoint: dict, batch_size: int, pause: float):
+        self.db = db
+        self.migration_id = migration_id
+        self.lock = lock
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.pause = pause
+
+    async def save_checkpoint(self, key: str, value, processed: int):
+        self.checkpoint[key] = value
+        await self.db.schema_migrations.update_one(
+            {"_id": self.migration_id},
+            {"$set": {f"checkpoint.{key}": value, "updated_at": datetime.now(timezone.utc)}, "$inc": {"processed": processed}}
+        )
+        await self.lock.renew()
+
+    async def batched_update(self, collection: str, query: dict, build_ops, projection: dict = None) -> int:
+        """Run build_ops(doc) -> [write ops] over every matching document, resumably"""
+        last_id = self.checkpoint.get(collection)
+        total = await self.db[collection].count_documents(query)
+        done = 0
+        while True:
+            batch_query = dict(query, **({"_id": {"$gt": last_id}} if last_id is not None else {}))
+            batch = await self.db[collection].find(batch_query, projection).sort("_id", 1).limit(self.batch_size).to_list(self.batch_size)
+            if not batch:
+                break
+            ops = [op for doc in batch for op in build_ops(doc)]
+            if ops:
+                await self.db[collection].bulk_write(ops, ordered=False)
+            last_id = batch[-1]["_id"]
+            done += len(batch)
+            await self.save_checkpoint(collection, last_id, len(batch))
+            logger.info("[%s] %s: %s/%s documents", self.migration_id, collection, done, total)
+            await asyncio.sleep(self.pause)
+        return done
+
+
+async def migration_status(db) -> list:
+    records = {r["_id"]: r for r in await db.schema_migrations.find().to_list(None)}
+    return [
+        {"id": m["id"], "description": m["description"], "status": records.get(m["id"], {}).get("status", "pending"),
+         "processed": records.get(m["id"], {}).get("processed", 0)}
+        for m in MIGRATIONS
+    ]
+
+
+async def run_migrations(db, batch_size: int = MIGRATION_BATCH_SIZE, pause: float = MIGRATION_BATCH_PAUSE) -> list:
+    """Apply pending migrations in order; returns the ids applied by this call"""
+    lock = MigrationLock(db)
+    if not await lock.acquire():
+        logger.info("Migrations are already running in another process")
+        return []
+    applied = []
+    try:
+        for m in MIGRATIONS:
+            record = await db.schema_migrations.find_one({"_id": m["id"]}) or {}
+            if record.get("status") == "applied":
+                continue
+            logger.info("Running migration %s: %s", m['id'], m['description'])
+            await db.schema_migrations.update_one(
+                {"_id": m["id"]},
+                {"$set": {"status": "running", "description": m["description"], "started_at": datetime.now(timezone.utc)},
+                 "$setOnInsert": {"checkpoint": {}, "processed": 0}},
+                upsert=True
+            )
+            ctx = MigrationContext(db, m["id"], lock, record.get("checkpoint", {}), batch_size, pause)
+            try:
+                await m["run"](ctx)
+            except asyncio.CancelledError:
+                # Shutdown; the next run resumes from the checkpoint
+                await db.schema_migrations.update_one({"_id": m["id"]}, {"$set": {"status": "interrupted"}})
+                logger.warning("Migration %s interrupted", m['id'])
+                raise
+            except Exception as e:
+                await db.schema_migrations.update_one({"_id": m["id"]}, {"$set": {"status": "failed", "error": str(e)}})
+                logger.error("Migration %s failed: %s", m['id'], e)
+                raise
+            await db.schema_migrations.update_one(
+                {"_id": m["id"]}, {"$set": {"status": "applied", "finished_at": datetime.now(timezone.utc)}}
+            )
+            applied.append(m["id"])
+    finally:
+        await lock.release()
+    return applied
+
+
+# ── Migrations ──
+
+# Collections whose created_at was historically stored as an ISO string
+DATETIME_COLLECTIONS = ("student_registrations", "partnerships", "gallery")
+
+
+def parse_iso_datetime(value: str) -> datetime:
+    parsed = datetime.fromisoformat(value)
+    return parsed if parsed.tzinfo else parsed.replace(tzinfo=timezone.utc)
+
+
+def iso_datetime_update(field: str):
+    def build_ops(doc):
+        try:
+            value = parse_iso_datetime(doc[field])
+        except ValueError:
+            logger.warning("Skipping %s: unparseable %s %r", doc['_id'], field, doc[field])
+            return []
+        # Only touch the document if nobody rewrote it since we read it
+        return [UpdateOne({"_id": doc["_id"], field: doc[field]}, {"$set": {field: value}})]
+    return build_ops
+
+
+@migration("0001_native_datetimes", "Store created_at as native BSON dates")
+async def native_datetimes(ctx: MigrationContext):
+    for collection in DATETIME_COLLECTIONS:
+        await ctx.batched_update(collection, {"created_at": {"$type": "string"}}, iso_datetime_update("created_at"), {"created_at": 1})
+
+
+@migration("0002_sync_sequence", "Number existing registrations and partnerships for delta sync")
+async def sync_sequence(ctx: MigrationContext):
+    for collection in sync.SYNCED_COLLECTIONS:
+        query = {"seq": {"$exists": False}}
+        missing = await ctx.db[collection].count_documents(query)
+        if not missing:
+            continue
+        # Reserve a block up front; documents inserted meanwhile already carry a seq
+        first = await sync.next_seq(ctx.db, collection, missing)
+        numbers = iter(range(first, first + missing))
+
+        def build_ops(doc):
+            seq = next(numbers, None)
+            if seq is None:
+                return []
+            created_at = doc.get("created_at")
+            updated_at = created_at if isinstance(created_at, datetime) else datetime.now(timezone.utc)
+            return [UpdateOne({"_id": doc["_id"], "seq": {"$exists": False}}, {"$set": {"seq": seq, "updated_at": updated_at}})]
+
+        await ctx.batched_update(collection, query, build_ops, {"created_at": 1})
@@ -0,0 +1,183 @@
+"""PyMongo event listeners used by the API's Mongo client.
+
+Listener callbacks run on PyMongo's threads, so they only update counters
+under a lock and never touch the event loop.
+"""
+import json
+import logging
+import threading
+import time
+from collections import defaultdict
+
+from pymongo import monitoring
+
+logger = logging.getLogger(__name__)
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Tracks open and checked-out connections per server for the readiness probe"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pools = defaultdict(lambda: {"open": 0, "checked_out": 0, "checkouts": 0, "checkout_failures": 0})
+
+    def _update(self, address, **deltas):
+        with self._lock:
+            pool = self._pools[f"{address[0]}:{address[1]}"]
+            for key, delta in deltas.items():
+                pool[key] = max(0, pool[key] + delta)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {address: dict(stats) for address, stats in self._pools.items()}
+
+    def pool_created(self, event):
+        self._update(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        with self._lock:
+            self._pools.pop(f"{event.address[0]}:{event.address[1]}", None)
+
+    def connection_created(self, event):
+        self._update(event.address, open=1)
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._update(event.address, open=-1)
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self._update(event.address, checkout_failures=1)
+
+    def connection_checked_out(self, event):
+        self._update(event.address, checked_out=1, checkouts=1)
+
+    def connection_checked_in(self, event):
+        self._update(event.address, checked_out=-1)
+
+
+# Handshake, auth and housekeeping commands that aren't interesting to time
+IGNORED_COMMANDS = {
+    "hello", "ismaster", "isMaster", "ping", "saslStart", "saslContinue", "authenticate",
+    "buildInfo", "endSessions", "killCursors", "explain", "getMore",
+}
+EXPLAINABLE_COMMANDS = {"find", "count", "aggregate", "distinct"}
+# Driver-added fields that must not be sent back inside an explain
+SESSION_FIELDS = {"lsid", "$clusterTime", "$db", "txnNumber", "$readPreference", "maxTimeMS"}
+EXPLAIN_INTERVAL_SECONDS = 300
+
+
+def filter_shape(value):
+    """Replace literal values with their type names so filters group by shape"""
+    if isinstance(value, dict):
+        return {key: filter_shape(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [filter_shape(item) for item in value[:3]]
+    return type(value).__name__
+
+
+def command_filter(name: str, command: dict):
+    if name in ("find", "count", "distinct"):
+        return command.get("filter", command.get("query"))
+    if name == "findAndModify":
+        return command.get("query")
+    if name == "aggregate":
+        return next((stage["$match"] for stage in command.get("pipeline", []) if "$match" in stage), None)
+    if name in ("update", "delete"):
+        statements = command.get("updates") or command.get("deletes") or []
+        return statements[0].get("q") if statements else None
+    return None
+
+
+class CommandMonitor(monitoring.CommandListener):
+    """Per command/collection timings, plus a log line (and optional plan) for slow commands.
+
+    `explain_handler(database, command)` is called for slow explainable commands
+    when set; the server uses it to schedule an explain() on the event loop.
+    """
+
+    def __init__(self, slow_ms: float, explain_handler=None):
+        self.slow_ms = slow_ms
+        self.explain_handler = explain_handler
+        self._lock = threading.Lock()
+        self._inflight = {}
+        self._stats = defaultdict(lambda: {"count": 0, "failures": 0, "slow": 0, "total_ms": 0.0, "max_ms": 0.0})
+        self._explained = {}
+
+    def started(self, event):
+        if event.command_name in IGNORED_COMMANDS:
+            return
+        collection = event.command.get(event.command_name)
+        shape = filter_shape(command_filter(event.command_name, event.command) or {})
+        explain = None
+        if self.explain_handler and event.command_name in EXPLAINABLE_COMMANDS:
+            explain = {key: value for key, value in event.command.items() if key not in SESSION_FIELDS}
+        with self._lock:
+            self._inflight[(event.connection_id, event.request_id)] = (
+                event.command_name, collection if isinstance(collection, str) else None, shape, event.database_name, explain
+            )
+
+    def succeeded(self, event):
+        self._finish(event, failed=False)
+
+    def failed(self, event):
+        self._finish(event, failed=True)
+
+    def _finish(self, event, failed: bool):
+        with self._lock:
+            inflight = self._inflight.pop((event.connection_id, event.request_id), None)
+        if inflight is None:
+            return
+        name, collection, shape, database, explain = inflight
+        duration_ms = event.duration_micros / 1000
+        slow = duration_ms >= self.slow_ms
+        with self._lock:
+            stats = self._stats[(name, collection)]
+            stats["count"] += 1
+            stats["failures"] += failed
+            stats["slow"] += slow
+            stats["total_ms"] += duration_ms
+            stats["max_ms"] = max(stats["max_ms"], duration_ms)
+        if not slow:
+            return
+        shape_json = json.dumps(shape, sort_keys=True)
+        logger.warning("Slow Mongo command: %s on %s took %.1f ms, filter %s", name, collection, duration_ms, shape_json)
+        if explain is not None and self._should_explain((name, collection, shape_json)):
+            self.explain_handler(database, explain)
+
+    def _should_explain(self, key) -> bool:
+        now = time.monotonic()
+        with self._lock:
+            if now - self._explained.get(key, float("-inf")) < EXPLAIN_INTERVAL_SECONDS:
+                return False
+            self._explained[key] = now
+            return True
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return sorted(
+                ({"command": name, "collection": collection, **stats, "total_ms": round(stats["total_ms"], 2),
+                  "max_ms": round(stats["max_ms"], 2), "avg_ms": round(stats["total_ms"] / stats["count"], 2) if stats["count"] else 0}
+                 for (name, collection), stats in self._stats.items()),
+                key=lambda entry: -entry["total_ms"]
+            )
+
+
+def summarize_plan(stage: dict) -> str:
+    """Render a winning plan as e.g. 'FETCH <- IXSCAN(email_1)' or 'COLLSCAN'"""
+    parts = []
+    while stage:
+        name = stage.get("stage", "?")
+        parts.append(f"{name}({stage['indexName']})" if stage.get("indexName") else name)
+        stage = stage.get("inputStage") or (stage.get("inputStages") or [None])[0]
+    return " <- ".join(parts)
@@ -0,0 +1,103 @@
+"""On-demand CPU profiling with pyinstrument's sampling profiler.
+
+Two modes, both producing speedscope (https://www.speedscope.app) JSON:
+  - sample_process(): profiles the event-loop thread, and so every request it
+    serves, for a fixed number of seconds;
+  - ProfilingMiddleware: profiles a single request carrying a valid
+    X-Profile-Token header; the result is kept in memory under the id returned
+    in the X-Profile-Id response header.
+"""
+import asyncio
+import hashlib
+import hmac
+import time
+import uuid
+from collections import OrderedDict
+from typing import Optional
+
+PROFILE_INTERVAL = 0.001
+MAX_STORED_PROFILES = 20
+
+_sampling_lock = asyncio.Lock()
+_profiles = OrderedDict()
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def speedscope(profiler) -> str:
+    from pyinstrument.renderers import SpeedscopeRenderer
+    return profiler.output(SpeedscopeRenderer())
+
+
+async def sample_process(seconds: float) -> str:
+    """Sample everything the event loop runs for `seconds`"""
+    from pyinstrument import Profiler
+    if _sampling_lock.locked():
+        raise ProfilerBusy("A profile is already being recorded")
+    async with _sampling_lock:
+        # async_mode="disabled" records the loop thread itself rather than following one task
+        profiler = Profiler(interval=PROFILE_INTERVAL, async_mode="disabled")
+        profiler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.stop()
+        return speedscope(profiler)
+
+
+def create_profile_token(secret: str, ttl_seconds: int) -> str:
+    expires = str(int(time.time()) + ttl_seconds)
+    signature = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return f"{expires}.{signature}"
+
+
+def valid_profile_token(secret: str, token: str) -> bool:
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    expected = hmac.new(secret.encode(), expires.encode(), hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+def get_profile(profile_id: str) -> Optional[dict]:
+    return _profiles.get(profile_id)
+
+
+def list_profiles() -> list:
+    return [{"id": pid, "path": p["path"], "created_at": p["created_at"]} for pid, p in reversed(_profiles.items())]
+
+
+class ProfilingMiddleware:
+    """Profiles requests that carry a valid signed X-Profile-Token header"""
+
+    def __init__(self, app, secret: str):
+        self.app = app
+        self.secret = secret
+
+    async def __call__(self, scope, receive, send):
+        token = None
+        if scope["type"] == "http":
+            token = next((v.decode("latin-1") for k, v in scope["headers"] if k == b"x-profile-token"), None)
+        if not token or not valid_profile_token(self.secret, token):
+            await self.app(scope, receive, send)
+            return
+
+        from pyinstrument import Profiler
+        profile_id = uuid.uuid4().hex[:12]
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+            await send(message)
+
+        profiler = Profiler(interval=PROFILE_INTERVAL, async_mode="enabled")
+        profiler.start()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profiler.stop()
+            _profiles[profile_id] = {"path": f"{scope['method']} {scope['path']}", "created_at": time.time(), "speedscope": speedscope(profiler)}
+            while len(_profiles) > MAX_STORED_PROFILES:
+                _profiles.popitem(last=False)
@@ -0,0 +1,39 @@
+"""Reconnect loop for long-lived Mongo cursors (change streams, tailable cursors).
+
+Both the live admin feed and the cache invalidation bus hold a cursor open for
+the life of the process and must survive replica set elections, network blips
+and a standalone server that cannot serve them at all, without hammering Mongo
+while it is down.
+"""
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+RETRY_MAX_SECONDS = 30
+
+
+async def reconnect_forever(follow, description: str, on_error=None):
+    """Run `await follow(connected)` until cancelled, restarting it whenever it returns or fails.
+
+    Failures are retried with exponential backoff up to RETRY_MAX_SECONDS;
+    `follow` calls `connected()` once its cursor is open to reset the delay.
+    `on_error(exc)` runs before each retry.
+    """
+    delay = 1
+
+    def connected():
+        nonlocal delay
+        delay = 1
+
+    while True:
+        try:
+            await follow(connected)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("%s interrupted (%s); retrying in %ds", description, e, delay)
+            if on_error is not None:
+                on_error(e)
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, RETRY_MAX_SECONDS)
@@ -1,40 +1,328 @@
-from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks, File, UploadFile, Form, Depends, status
-from fastapi.responses import JSONResponse
+import time
+IMPORT_STARTED = time.perf_counter()
+
+from fastapi import FastAPI, APIRouter, HTTPException, BackgroundTasks, File, UploadFile, Form, Depends, Request, status
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+import pymongo
+from pymongo import ReturnDocument, IndexModel, ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError, BulkWriteError
 import os
 import logging
-import cloudinary
-import cloudinary.uploader
-from pathlib import Path
+import asyncio
+import importlib.util
+from contextlib import asynccontextmanager
+import shutil
+from pathlib import Path, PurePosixPath
+from functools import lru_cache
 from pydantic import BaseModel, Field, EmailStr
-from typing import List, Optional
+from typing import Dict, List, Optional, Union
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
 import hashlib
+import aiofiles
+from mongo_monitoring import PoolMonitor, CommandMonitor, summarize_plan
+from cache import TTLCache, SingleFlight
+from cache_bus import InvalidationBus
+from live_events import ChangeFeed, encode_event
+from idempotency import IdempotencyStore
+from admission import AdmissionMiddleware, Limiter
+from compression import CompressionMiddleware, JsonPayload
+import sync
+import batch
+from tracing import tracer, span_since, configure_tracing, shutdown_tracing, TracingMiddleware
+from log_config import configure_logging, stop_logging, RequestIdMiddleware
+import profiling
+from profiling import ProfilingMiddleware
+import memory_diagnostics
+from starlette.concurrency import run_in_threadpool
 
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
-# MongoDB connection
+configure_logging()
+logger = logging.getLogger(__name__)
+email_logger = logging.getLogger(f"{__name__}.email")
+
+# MongoDB connection — created in the app lifespan by connect_mongo()
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ['DB_NAME']]
-
-# Cloudinary configuration
-cloudinary.config(
-    cloud_name=os.environ.get('CLOUDINARY_CLOUD_NAME'),
-    api_key=os.environ.get('CLOUDINARY_API_KEY'),
-    api_secret=os.environ.get('CLOUDINARY_API_SECRET')
-)
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', 50))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', 5))
+MONGO_CONNECT_TIMEOUT_MS = int(os.environ.get('MONGO_CONNECT_TIMEOUT_MS', 5000))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', 5000))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.environ.get('MONGO_WAIT_QUEUE_TIMEOUT_MS', 5000))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', 300000))
+MONGO_COMPRESSORS = os.environ.get('MONGO_COMPRESSORS', 'zstd,snappy,zlib')
+READY_PING_TIMEOUT = float(os.environ.get('READY_PING_TIMEOUT', 2))
+SLOW_QUERY_MS = float(os.environ.get('SLOW_QUERY_MS', 100))
+SLOW_QUERY_EXPLAIN = os.environ.get('SLOW_QUERY_EXPLAIN') == '1'
+STARTUP_WARMUP = os.environ.get('STARTUP_WARMUP', '1') == '1'
+INDEX_RETRY_SECONDS = 30
+
+# Time budgets (ms) for the Mongo work of each kind of endpoint
+QUERY_BUDGETS_MS = {
+    "public": int(os.environ.get('QUERY_BUDGET_PUBLIC_MS', 2000)),
+    "submission": int(os.environ.get('QUERY_BUDGET_SUBMISSION_MS', 5000)),
+    "admin": int(os.environ.get('QUERY_BUDGET_ADMIN_MS', 10000)),
+}
+DISCONNECT_POLL_SECONDS = 0.5
+
+# Python packages the optional wire compressors need
+COMPRESSOR_MODULES = {"zstd": "zstandard", "snappy": "snappy"}
+
+client: Optional[AsyncIOMotorClient] = None
+db = None
+pool_monitor = PoolMonitor()
+command_monitor = CommandMonitor(slow_ms=SLOW_QUERY_MS)
+
+def available_compressors() -> List[str]:
+    """Configured wire compressors whose libraries are installed (zlib is built in)"""
+    return [
+        name for name in (c.strip() for c in MONGO_COMPRESSORS.split(',')) if name
+        and (name not in COMPRESSOR_MODULES or importlib.util.find_spec(COMPRESSOR_MODULES[name]))
+    ]
+
+def connect_mongo():
+    global client, db
+    client = AsyncIOMotorClient(
+        mongo_url,
+        tz_aware=True,
+        maxPoolSize=MONGO_MAX_POOL_SIZE,
+        minPoolSize=MONGO_MIN_POOL_SIZE,
+        maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+        connectTimeoutMS=MONGO_CONNECT_TIMEOUT_MS,
+        serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+        waitQueueTimeoutMS=MONGO_WAIT_QUEUE_TIMEOUT_MS,
+        compressors=available_compressors() or None,
+        event_listeners=[pool_monitor, command_monitor],
+    )
+    db = client[os.environ['DB_NAME']]
+
+def close_mongo():
+    global client, db
+    if client is not None:
+        client.close()
+    client, db = None, None
+
+def query_budget(kind: str):
+    """Deadline for every Mongo operation in the block (sent to the server as maxTimeMS)"""
+    return pymongo.timeout(QUERY_BUDGETS_MS[kind] / 1000)
+
+def db_failure(e: Exception, detail: str) -> HTTPException:
+    """503 when a query ran out of its time budget, 500 otherwise"""
+    if isinstance(e, PyMongoError) and e.timeout:
+        return HTTPException(
+            status_code=503, detail="The database took too long to respond. Please try again shortly.",
+            headers={"Retry-After": "5"}
+        )
+    return HTTPException(status_code=500, detail=detail)
+
+def trace_request_body(request: Request, name: str):
+    """Span from request start to handler entry: receiving and parsing the form"""
+    start_ns = getattr(request.state, "request_start_ns", None)
+    if start_ns:
+        span_since(name, start_ns)
+
+async def find_existing_email(email: str) -> tuple:
+    """The student and partnership lookups that enforce one registration per email"""
+    with tracer.start_as_current_span("uniqueness_check"), query_budget("submission"):
+        with tracer.start_as_current_span("mongo.find_one student_registrations"):
+            existing_student = await db.student_registrations.find_one({"email": email})
+        with tracer.start_as_current_span("mongo.find_one partnerships"):
+            existing_partnership = await db.partnerships.find_one({"email": email})
+    return existing_student, existing_partnership
+
+def operation_tag() -> str:
+    """Unique `comment` for a request's Mongo operations, so until_disconnect can find and kill them"""
+    return f"whibc-{uuid.uuid4().hex}"
+
+async def kill_tagged_operations(tag: str):
+    """killOp the server-side operations carrying `tag`.
+
+    Needs the killop privilege; without it the operations run on until their
+    maxTimeMS budget expires.
+    """
+    try:
+        with query_budget("admin"):
+            result = await client.admin.command({"currentOp": 1, "command.comment": tag})
+            for op in result.get("inprog", []):
+                await client.admin.command({"killOp": 1, "op": op["opid"]})
+    except Exception as e:
+        logger.warning("Could not kill operations of a disconnected request: %s", e)
+
+async def until_disconnect(request: Request, awaitable, cursors=(), tag: Optional[str] = None):
+    """Await a query; if the client goes away, stop waiting, close its cursors and kill the
+    server-side operations tagged with `tag` (see operation_tag)"""
+    task = asyncio.ensure_future(awaitable)
+    while not task.done():
+        await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+        if not task.done() and await request.is_disconnected():
+            task.cancel()
+            for cursor in cursors:
+                await cursor.close()
+            if tag:
+                await kill_tagged_operations(tag)
+            raise HTTPException(status_code=499, detail="Client closed request")
+    return task.result()
+
+async def explain_slow_command(database: str, command: dict):
+    try:
+        with query_budget("admin"):
+            plan = await client[database].command({"explain": command, "verbosity": "queryPlanner"})
+        winning_plan = plan.get("queryPlanner", {}).get("winningPlan", {})
+        name = next(iter(command))
+        logger.warning("Slow Mongo command plan for %s on %s: %s", name, command[name], summarize_plan(winning_plan))
+    except Exception as e:
+        logger.warning("Explain for slow command failed: %s", e)
+
+def enable_slow_query_explain():
+    """Listener callbacks run on driver threads, so hand explains back to the event loop"""
+    loop = asyncio.get_running_loop()
+    command_monitor.explain_handler = lambda database, command: asyncio.run_coroutine_threadsafe(
+        explain_slow_command(database, command), loop
+    )
+
+async def ensure_indexes():
+    await asyncio.gather(
+        db.student_registrations.create_indexes([IndexModel([("email", ASCENDING)]), IndexModel([("created_at", DESCENDING)]),
+                                    IndexModel([("seq", ASCENDING)])]),
+        db.partnerships.create_indexes([IndexModel([("email", ASCENDING)]), IndexModel([("created_at", DESCENDING)]),
+                                    IndexModel([("seq", ASCENDING)])]),
+        db.gallery.create_indexes([IndexModel([("id", ASCENDING)]), IndexModel([("created_at", DESCENDING)])]),
+        db.chunked_uploads.create_indexes([IndexModel([("id", ASCENDING)], unique=True),
+                                           IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0)]),
+        db.idempotency_keys.create_indexes([IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0)]),
+        db.tombstones.create_indexes([IndexModel([("collection", ASCENDING), ("seq", ASCENDING)])]),
+    )
+
+async def ensure_indexes_until_done():
+    """Create the indexes at startup, retrying while Mongo is unreachable.
+
+    Runs whether or not the warm-up does: without the TTL indexes the
+    idempotency keys and upload sessions would never expire.
+    """
+    while True:
+        try:
+            await ensure_indexes()
+            logger.info("Indexes ensured")
+            return
+        except Exception as e:
+            logger.warning("Creating indexes failed (%s); retrying in %ds", e, INDEX_RETRY_SECONDS)
+            await asyncio.sleep(INDEX_RETRY_SECONDS)
+
+async def prewarm_mongo():
+    """Open MONGO_MIN_POOL_SIZE connections up front so the first requests don't pay for the handshakes"""
+    started = time.perf_counter()
+    await asyncio.gather(*(db.command("ping") for _ in range(max(1, MONGO_MIN_POOL_SIZE))))
+    logger.info("Mongo pool pre-warmed in %.0f ms", (time.perf_counter() - started) * 1000)
+
+# Cloudinary configuration — imported on first use to keep cold starts fast
+@lru_cache(maxsize=None)
+def cloudinary_api():
+    import cloudinary
+    import cloudinary.uploader
+    import cloudinary.utils
+    cloudinary.config(
+        cloud_name=os.environ.get('CLOUDINARY_CLOUD_NAME'),
+        api_key=os.environ.get('CLOUDINARY_API_KEY'),
+        api_secret=os.environ.get('CLOUDINARY_API_SECRET')
+    )
+    return cloudinary
+
+# File storage: Cloudinary when configured, otherwise the local uploads directory
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND') or ('cloudinary' if os.environ.get('CLOUDINARY_CLOUD_NAME') else 'local')
+LOCAL_UPLOAD_DIR = Path(os.environ.get('LOCAL_UPLOAD_DIR', ROOT_DIR / 'uploads'))
+LOCAL_UPLOAD_URL = os.environ.get('LOCAL_UPLOAD_URL', '/api/files')
+STATIC_SITE_DIR = os.environ.get('STATIC_SITE_DIR')
+
+async def warm_up(app: FastAPI):
+    """Open connections and fill the gallery cache, then mark the app ready"""
+    started = time.perf_counter()
+    try:
+        await prewarm_mongo()
+        await load_gallery()
+    except Exception as e:
+        # Keep serving; /api/ready reports the database as unavailable
+        logger.error("Startup warm-up failed: %s", e)
+    app.state.ready = True
+    logger.info(
+        "Startup complete: module import %.0f ms, warm-up %.0f ms (run `python manage.py importtime` for a per-module breakdown)",
+        IMPORT_DURATION_MS, (time.perf_counter() - started) * 1000
+    )
+
+async def log_memory_stats_periodically():
+    while True:
+        await asyncio.sleep(MEMORY_STATS_INTERVAL)
+        memory_diagnostics.log_memory_stats()
+
+def sweep_partial_uploads() -> int:
+    """Delete .part files untouched for longer than an upload session lasts"""
+    cutoff = time.time() - UPLOAD_SESSION_HOURS * 3600
+    removed = 0
+    for path in UPLOAD_TMP_DIR.glob("*.part"):
+        try:
+            if path.stat().st_mtime < cutoff:
+                path.unlink()
+                removed += 1
+        except FileNotFoundError:
+            pass
+    return removed
+
+async def sweep_partial_uploads_periodically():
+    while True:
+        try:
+            removed = await run_in_threadpool(sweep_partial_uploads)
+            if removed:
+                logger.info("Removed %s abandoned partial uploads", removed)
+        except Exception as e:
+            logger.warning("Partial upload sweep failed: %s", e)
+        await asyncio.sleep(PARTIAL_UPLOAD_SWEEP_INTERVAL)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_tracing()
+    connect_mongo()
+    if SLOW_QUERY_EXPLAIN:
+        enable_slow_query_explain()
+    app.state.index_task = asyncio.create_task(ensure_indexes_until_done())
+    app.state.ready = not STARTUP_WARMUP
+    if STARTUP_WARMUP:
+        app.state.warmup_task = asyncio.create_task(warm_up(app))
+    else:
+        logger.info("Startup complete: module import %.0f ms", IMPORT_DURATION_MS)
+    # The migration lock makes this safe with several workers; only one runs them
+    if os.environ.get('RUN_MIGRATIONS_ON_STARTUP') == '1':
+        app.state.migrations_task = asyncio.create_task(run_startup_migrations())
+    if MEMORY_STATS_INTERVAL > 0:
+        app.state.memory_stats_task = asyncio.create_task(log_memory_stats_periodically())
+    if CACHE_BUS_ENABLED:
+        app.state.cache_bus_task = asyncio.create_task(cache_bus.run())
+    app.state.upload_sweep_task = asyncio.create_task(sweep_partial_uploads_periodically())
+    yield
+    # Stop everything that uses Mongo before the client closes; a cancelled migration
+    # releases its lock and resumes from its checkpoint next time
+    background = [getattr(app.state, name, None) for name in (
+        "index_task", "warmup_task", "migrations_task", "memory_stats_task", "upload_sweep_task", "cache_bus_task")]
+    background = [task for task in background if task is not None]
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await change_feed.close()
+    close_mongo()
+    shutdown_image_pool()
+    shutdown_tracing()
+    stop_logging()
 
 # Create the main app without a prefix
-app = FastAPI(title="WHIBC Portal API")
+app = FastAPI(title="WHIBC Portal API", lifespan=lifespan)
 
 # Create a router with the /api prefix
 api_router = APIRouter(prefix="/api")
@@ -44,8 +332,17 @@ JWT_SECRET = os.getenv('JWT_SECRET', 'whibc-admin-secret-key-2025')
 JWT_ALGORITHM = 'HS256'
 JWT_EXPIRATION_HOURS = 24
 
+# Profiling
+PROFILING_SECRET = os.getenv('PROFILING_SECRET', JWT_SECRET)
+PROFILE_MAX_SECONDS = 60
+PROFILE_TOKEN_MINUTES = 15
+
+# Memory diagnostics
+MEMORY_STATS_INTERVAL = float(os.environ.get('MEMORY_STATS_INTERVAL', 300))
+
 # Security
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 # Admin credentials
 ADMIN_CREDENTIALS = {
@@ -53,17 +350,69 @@ ADMIN_CREDENTIALS = {
     "superadmin": "whibc@admin2025"
 }
 
+# Chunked uploads
+UPLOAD_TMP_DIR = Path(os.environ.get('UPLOAD_TMP_DIR', ROOT_DIR / 'partial_uploads'))
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', 25 * 1024 * 1024))
+UPLOAD_CHUNK_MAX_BYTES = int(os.environ.get('UPLOAD_CHUNK_MAX_BYTES', 5 * 1024 * 1024))
+UPLOAD_SESSION_HOURS = 24
+# How long a completion may spend storing the file before another request may take it over
+UPLOAD_STORE_LEASE_SECONDS = 15 * 60
+PARTIAL_UPLOAD_SWEEP_INTERVAL = float(os.environ.get('PARTIAL_UPLOAD_SWEEP_INTERVAL', 3600))
+UPLOAD_KINDS = {"student_doc", "partnership_doc"}
+# Idempotency-Key handling for the submission endpoints
+IDEMPOTENCY_TTL_HOURS = float(os.environ.get('IDEMPOTENCY_TTL_HOURS', 24))
+IDEMPOTENCY_WAIT_SECONDS = float(os.environ.get('IDEMPOTENCY_WAIT_SECONDS', 30))
+IDEMPOTENCY_LOCK_SECONDS = float(os.environ.get('IDEMPOTENCY_LOCK_SECONDS', 120))
+idempotency = IdempotencyStore(lambda: db, IDEMPOTENCY_TTL_HOURS, IDEMPOTENCY_WAIT_SECONDS, IDEMPOTENCY_LOCK_SECONDS)
+
+# Admission control: (concurrency limit, wait queue size, max wait seconds) per route class
+ADMISSION_CONTROL = os.environ.get('ADMISSION_CONTROL', '1') == '1'
+def admission_limiter(route_class: str, limit: int, queue_size: int, max_wait: float) -> Limiter:
+    prefix = f"ADMISSION_{route_class.upper()}"
+    return Limiter(int(os.environ.get(f'{prefix}_LIMIT', limit)),
+                   int(os.environ.get(f'{prefix}_QUEUE', queue_size)),
+                   float(os.environ.get(f'{prefix}_MAX_WAIT', max_wait)))
+admission_limiters = {
+    "submission": admission_limiter("submission", 20, 100, 10),
+    "upload": admission_limiter("upload", 50, 200, 30),
+    "public_read": admission_limiter("public_read", 100, 500, 2),
+    "admin": admission_limiter("admin", 10, 50, 15),
+}
+
+# Gallery image processing
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', 2))
+SRCSET_WIDTHS = [320, 640, 960, 1280, 1920]
+GALLERY_BATCH_CONCURRENCY = int(os.environ.get('GALLERY_BATCH_CONCURRENCY', 4))
+GALLERY_BATCH_MAX_FILES = int(os.environ.get('GALLERY_BATCH_MAX_FILES', 300))
+GALLERY_CACHE_TTL = float(os.environ.get('GALLERY_CACHE_TTL', 60))
+gallery_cache = TTLCache(ttl=GALLERY_CACHE_TTL, maxsize=1)
+DASHBOARD_CACHE_TTL = float(os.environ.get('DASHBOARD_CACHE_TTL', 30))
+dashboard_cache = TTLCache(ttl=DASHBOARD_CACHE_TTL, maxsize=1)
+EMAIL_CACHE_TTL = float(os.environ.get('EMAIL_CACHE_TTL', 60))
+email_cache = TTLCache(ttl=EMAIL_CACHE_TTL, maxsize=10000)
+# Keeps the caches above consistent across uvicorn workers
+CACHE_BUS_ENABLED = os.environ.get('CACHE_BUS', '1') == '1'
+cache_bus = InvalidationBus(lambda: db)
+cache_bus.register("gallery", gallery_cache)
+cache_bus.register("dashboard", dashboard_cache)
+cache_bus.register("email", email_cache)
+# Concurrent cache misses for the same read share one Mongo query
+read_coalescer = SingleFlight()
+EVENTS_HEARTBEAT_SECONDS = float(os.environ.get('EVENTS_HEARTBEAT_SECONDS', 15))
+# Tickets only need to outlive the time it takes to open the stream
+EVENTS_TICKET_SECONDS = 60
+EVENTS_TICKET_PURPOSE = "events"
+image_pool: Optional[ProcessPoolExecutor] = None
+
 
 # Email Service
 def send_email_simple(to: str, subject: str, content: str):
     """Simple email logging (no external dependency)"""
     try:
-        logging.info(f"Email would be sent to: {to}")
-        logging.info(f"Subject: {subject}")
-        logging.info(f"Content: {content[:100]}...")
+        email_logger.info("Email would be sent to %s: %s", to, subject, extra={"content_length": len(content)})
         return True
     except Exception as e:
-        logging.error(f"Email simulation error: {str(e)}")
+        email_logger.error("Email simulation error: %s", e)
         return False
 
 
@@ -135,14 +484,52 @@ class GalleryImage(BaseModel):
     filename: str
     path: str
     category: str
+    variants: Dict[str, Dict[str, str]] = Field(default_factory=dict)
+    width: Optional[int] = None
+    height: Optional[int] = None
+    dominant_color: Optional[str] = None
+    placeholder: Optional[str] = None
+    srcset: Optional[str] = None
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class ChunkedUploadInit(BaseModel):
+    filename: str
+    total_size: int = Field(..., gt=0)
+    kind: str = "student_doc"
+    sha256: Optional[str] = None
+
+class ChunkedUpload(BaseModel):
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    filename: str
+    kind: str
+    total_size: int
+    received: int = 0
+    sha256: Optional[str] = None
+    status: str = "pending"  # pending -> storing -> complete -> attached
+    storing_until: Optional[datetime] = None
+    document_filename: Optional[str] = None
+    document_path: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    expires_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc) + timedelta(hours=UPLOAD_SESSION_HOURS))
+
+class ChunkedUploadStatus(BaseModel):
+    upload_id: str
+    status: str
+    offset: int
+    total_size: int
+    chunk_size: int
+
 
 # Helpers
 def prepare_for_mongo(data):
-    """Convert datetime objects to ISO strings for MongoDB storage"""
+    """Normalise datetimes to UTC so MongoDB stores them as native BSON dates.
+
+    Older documents may still hold ISO strings until `manage.py migrate`
+    has run; the Pydantic models parse both shapes, and in a descending sort BSON
+    orders dates before strings, so newer native dates still come first.
+    """
     if isinstance(data.get('created_at'), datetime):
-        data['created_at'] = data['created_at'].isoformat()
+        data['created_at'] = data['created_at'].astimezone(timezone.utc)
     return data
 
 def verify_password(plain_password: str, username: str) -> bool:
@@ -155,10 +542,28 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    return username_from_token(credentials.credentials)
+
+def verify_stream_token(ticket: Optional[str] = None,
+                        credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
+    """Like verify_token, but also accepts a ?ticket= from POST /admin/events/ticket.
+
+    EventSource cannot send headers, and a URL ends up in access logs, so the
+    query only takes a short-lived ticket that is good for nothing but the stream.
+    """
+    if credentials is not None:
+        return username_from_token(credentials.credentials)
+    if ticket is None:
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Not authenticated",
+                            headers={"WWW-Authenticate": "Bearer"})
+    return username_from_token(ticket, purpose=EVENTS_TICKET_PURPOSE)
+
+def username_from_token(token: str, purpose: Optional[str] = None) -> str:
+    """Username from a JWT; `purpose` must match, so a stream ticket is never accepted as an admin token"""
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         username: str = payload.get("sub")
-        if username is None:
+        if username is None or payload.get("purpose") != purpose:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Invalid authentication credentials",
@@ -173,20 +578,313 @@ def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
         )
 
 
-# File upload — Cloudinary
+# File upload — Cloudinary or local disk
+# Uploads are stored under the extension of their detected type, never the client's
+ALLOWED_UPLOAD_EXTENSIONS = {".pdf", ".doc", ".docx", ".jpg", ".jpeg", ".png", ".webp", ".avif"}
+UPLOAD_SIGNATURES = [
+    (b"%PDF-", ".pdf"),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", ".doc"),
+    (b"PK\x03\x04", ".docx"),
+    (b"\xff\xd8\xff", ".jpg"),
+    (b"\x89PNG\r\n\x1a\n", ".png"),
+]
+# Everything else is served as a download
+INLINE_UPLOAD_EXTENSIONS = {".jpg", ".jpeg", ".png", ".webp", ".avif"}
+UNSUPPORTED_FILE_TYPE = "Unsupported file type. Please upload a PDF, Word document or JPEG, PNG, WebP or AVIF image."
+
+def detect_file_type(head: bytes) -> Optional[str]:
+    """Extension for the file's magic bytes, or None if it isn't an allowed type"""
+    for signature, extension in UPLOAD_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ".webp"
+    if head[4:12] in (b"ftypavif", b"ftypavis"):
+        return ".avif"
+    return None
+
+def check_upload_filename(filename: Optional[str]):
+    if Path(filename or "").suffix.lower() not in ALLOWED_UPLOAD_EXTENSIONS:
+        raise HTTPException(status_code=415, detail=UNSUPPORTED_FILE_TYPE)
+
+def upload_extension(source) -> str:
+    if isinstance(source, Path):
+        with open(source, 'rb') as f:
+            head = f.read(16)
+    else:
+        head = bytes(source[:16])
+    extension = detect_file_type(head)
+    if extension is None:
+        raise HTTPException(status_code=415, detail=UNSUPPORTED_FILE_TYPE)
+    return extension
+
+class UploadedFiles(StaticFiles):
+    """Local uploads are untrusted: never let the browser sniff or render them as a page"""
+
+    def file_response(self, full_path, *args, **kwargs) -> Response:
+        response = super().file_response(full_path, *args, **kwargs)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["Content-Security-Policy"] = "default-src 'none'; sandbox"
+        if Path(full_path).suffix.lower() not in INLINE_UPLOAD_EXTENSIONS:
+            response.headers["Content-Disposition"] = "attachment"
+        return response
+
+def write_local_file(source, name: str):
+    LOCAL_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    if isinstance(source, Path):
+        shutil.copyfile(source, LOCAL_UPLOAD_DIR / name)
+    else:
+        (LOCAL_UPLOAD_DIR / name).write_bytes(source)
+
+async def store_file(source, prefix: str, public_id: Optional[str] = None) -> tuple:
+    """Store bytes or a local file path and return (public_id, url); 415 unless it's an allowed type"""
+    public_id = public_id or f"{prefix}_{uuid.uuid4()}"
+    extension = await run_in_threadpool(upload_extension, source) if isinstance(source, Path) else upload_extension(source)
+    if STORAGE_BACKEND == 'local':
+        name = public_id + extension
+        await run_in_threadpool(write_local_file, source, name)
+        return name, f"{LOCAL_UPLOAD_URL}/{name}"
+    result = await run_in_threadpool(
+        cloudinary_api().uploader.upload,
+        str(source) if isinstance(source, Path) else source,
+        public_id=public_id,
+        folder="whibc",
+        resource_type="auto"
+    )
+    return result['public_id'], result['secure_url']
+
 async def save_uploaded_file(file: UploadFile, prefix: str) -> tuple:
-    """Upload file to Cloudinary and return (public_id, secure_url)"""
+    """Store an uploaded file and return (public_id, url)"""
     if file.filename:
+        check_upload_filename(file.filename)
         content = await file.read()
-        result = cloudinary.uploader.upload(
-            content,
-            public_id=f"{prefix}_{uuid.uuid4()}",
-            folder="whibc"
-        )
-        return result['public_id'], result['secure_url']
+        return await store_file(content, prefix)
     return None, None
 
 
+def delete_stored_files(public_ids: List[str]):
+    for public_id in public_ids:
+        try:
+            if STORAGE_BACKEND == 'local':
+                (LOCAL_UPLOAD_DIR / PurePosixPath(public_id).name).unlink(missing_ok=True)
+            else:
+                cloudinary_api().uploader.destroy(public_id)
+        except Exception:
+            pass
+
+
+# Gallery processing — metadata and resized variants computed in the process pool
+def get_image_pool() -> ProcessPoolExecutor:
+    global image_pool
+    if image_pool is None:
+        import imaging
+        image_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS, mp_context=imaging.pool_context())
+    return image_pool
+
+def discard_image_pool(pool: ProcessPoolExecutor):
+    """Drop a broken pool so the next call starts a fresh one"""
+    global image_pool
+    if image_pool is pool:
+        image_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+async def run_in_image_pool(fn, *args):
+    # A worker that dies (OOM, codec crash) breaks the whole pool; replace it and retry once
+    for attempt in range(2):
+        pool = get_image_pool()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            discard_image_pool(pool)
+            if attempt:
+                raise
+            logger.warning("Image worker pool broke; restarting it")
+
+def shutdown_image_pool():
+    global image_pool
+    if image_pool is not None:
+        image_pool.shutdown(wait=False, cancel_futures=True)
+        image_pool = None
+
+def variant_public_ids(filename: str, variants: dict) -> List[str]:
+    if STORAGE_BACKEND == 'local':
+        return [url.rsplit('/', 1)[-1] for formats in variants.values() for url in formats.values()]
+    return [f"{filename}_{size}_{fmt}" for size, formats in variants.items() for fmt in formats]
+
+@lru_cache(maxsize=2048)
+def cloudinary_srcset(public_id: str, width: Optional[int]) -> str:
+    """Width-stepped f_auto/q_auto delivery URLs, never wider than the original"""
+    widths = [w for w in SRCSET_WIDTHS if not width or w < width] + ([width] if width and width <= SRCSET_WIDTHS[-1] else [])
+    return ", ".join(
+        f"{cloudinary_api().utils.cloudinary_url(public_id, width=w, crop='limit', fetch_format='auto', quality='auto', secure=True)[0]} {w}w"
+        for w in widths
+    )
+
+def local_srcset(variants: dict, width: Optional[int], height: Optional[int]) -> Optional[str]:
+    """srcset built from the stored WebP variants when Cloudinary isn't used"""
+    if not width or not height:
+        return None
+    import imaging
+    entries = {}
+    for size, formats in variants.items():
+        if 'webp' in formats:
+            scale = min(1, imaging.VARIANT_SIZES[size] / max(width, height))
+            entries[round(width * scale)] = formats['webp']
+    return ", ".join(f"{url} {w}w" for w, url in sorted(entries.items())) or None
+
+def build_srcset(filename: str, variants: dict, width: Optional[int], height: Optional[int]) -> Optional[str]:
+    if STORAGE_BACKEND == 'local':
+        return local_srcset(variants, width, height)
+    return cloudinary_srcset(filename, width)
+
+def with_srcset(img: dict) -> dict:
+    """Fill srcset for gallery documents stored before it was generated at upload"""
+    if not img.get('srcset') and img.get('filename'):
+        img['srcset'] = build_srcset(img['filename'], img.get('variants') or {}, img.get('width'), img.get('height'))
+    return img
+
+async def process_gallery_image(content: bytes, name: str) -> tuple:
+    """Decode an upload and encode its resized variants; returns (metadata, {size: {format: bytes}})"""
+    import imaging
+    try:
+        with tracer.start_as_current_span("process_image"):
+            return await run_in_image_pool(imaging.process_gallery_image, content)
+    except imaging.InvalidImage as e:
+        logger.warning("Rejected gallery upload %s: %s", name, e)
+        raise HTTPException(status_code=422, detail="The file could not be read as an image.")
+    except BrokenProcessPool:
+        # It crashed a fresh worker too, so it was never checked; don't store it unverified
+        logger.warning("Gallery upload %s crashed the image workers", name)
+        raise HTTPException(status_code=422, detail="The image could not be processed.")
+    except Exception as e:
+        # A readable image whose variants failed to encode is still stored, without them
+        logger.warning("Gallery image processing failed for %s: %s", name, e)
+        return {}, {}
+
+async def store_variants(filename: str, encoded: dict) -> dict:
+    """Store encoded variants next to the original; returns {size: {format: url}}"""
+    base = PurePosixPath(filename).stem
+    jobs = [(size, fmt, data) for size, formats in encoded.items() for fmt, data in formats.items()]
+    with tracer.start_as_current_span("store_variants", attributes={"count": len(jobs)}):
+        results = await asyncio.gather(*(
+            store_file(data, "gallery", public_id=f"{base}_{size}_{fmt}") for size, fmt, data in jobs
+        ))
+    variants: Dict[str, Dict[str, str]] = {}
+    for (size, fmt, _), (_, url) in zip(jobs, results):
+        variants.setdefault(size, {})[fmt] = url
+    return variants
+
+async def create_gallery_item(image: UploadFile, title: str, description: str, category: str) -> GalleryImage:
+    """Store an uploaded image with its variants and build (but don't insert) its gallery document"""
+    content = await image.read()
+    # Decode before storing anything, so a file that isn't an image is rejected outright
+    metadata, encoded = await process_gallery_image(content, image.filename or "")
+    with tracer.start_as_current_span("store_original", attributes={"bytes": len(content)}):
+        filename, file_path = await store_file(content, "gallery")
+    variants = await store_variants(filename, encoded)
+    srcset = build_srcset(filename, variants, metadata.get('width'), metadata.get('height'))
+    return GalleryImage(title=title, description=description, filename=filename, path=file_path, category=category, variants=variants, srcset=srcset, **metadata)
+
+
+def gallery_public_ids(item: GalleryImage) -> List[str]:
+    return [item.filename] + variant_public_ids(item.filename, item.variants)
+
+async def unsaved_gallery_items(items: List[GalleryImage], error: Exception) -> Optional[List[GalleryImage]]:
+    """Which of `items` a failed insert did not save, or None if that can't be determined.
+
+    An unordered insert_many reports the documents it rejected; anything else
+    (a timeout, a dropped connection) may still have saved some, so ask.
+    """
+    if isinstance(error, BulkWriteError) and not error.details.get("writeConcernErrors"):
+        failed = {write_error["index"] for write_error in error.details.get("writeErrors", [])}
+        return [item for index, item in enumerate(items) if index in failed]
+    try:
+        with query_budget("admin"):
+            saved = {doc["id"] for doc in await db.gallery.find({"id": {"$in": [item.id for item in items]}}, {"id": 1}).to_list(None)}
+    except Exception as e:
+        logger.error("Could not check which gallery images were saved: %s", e)
+        return None
+    return [item for item in items if item.id not in saved]
+
+async def discard_gallery_items(items: List[GalleryImage]):
+    """Remove the stored files of gallery items whose documents were not saved"""
+    public_ids = [public_id for item in items for public_id in gallery_public_ids(item)]
+    if public_ids:
+        await run_in_threadpool(delete_stored_files, public_ids)
+
+
+async def load_gallery() -> JsonPayload:
+    version = gallery_cache.version
+    images = await db.gallery.find().sort("created_at", -1).to_list(1000)
+    gallery = JsonPayload([GalleryImage(**with_srcset(img)) for img in images])
+    await run_in_threadpool(gallery.precompress)
+    gallery_cache.set("gallery", gallery, version)
+    return gallery
+
+
+# Chunked uploads — assembled on local disk, then handed to store_file
+def chunk_path(upload_id: str) -> Path:
+    return UPLOAD_TMP_DIR / f"{upload_id}.part"
+
+def upload_status(upload: dict) -> ChunkedUploadStatus:
+    return ChunkedUploadStatus(
+        upload_id=upload['id'], status=upload['status'], offset=upload['received'],
+        total_size=upload['total_size'], chunk_size=UPLOAD_CHUNK_MAX_BYTES
+    )
+
+async def get_active_upload(upload_id: str) -> dict:
+    try:
+        with query_budget("submission"):
+            upload = await db.chunked_uploads.find_one({"id": upload_id})
+    except Exception as e:
+        logger.error("Chunked upload lookup error: %s", e)
+        raise db_failure(e, "Failed to look up upload")
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    if upload['expires_at'] < datetime.now(timezone.utc):
+        raise HTTPException(status_code=410, detail="Upload session expired. Please start again.")
+    return upload
+
+async def claim_chunked_upload(upload_id: str, kind: str) -> tuple:
+    """Attach a completed chunked upload to a submission and return (public_id, secure_url)"""
+    with query_budget("submission"):
+        upload = await db.chunked_uploads.find_one_and_update(
+            {"id": upload_id, "kind": kind, "status": "complete"},
+            {"$set": {"status": "attached"}}
+        )
+    if not upload:
+        raise HTTPException(status_code=400, detail="Document upload not found or not complete.")
+    return upload['document_filename'], upload['document_path']
+
+async def release_stored_upload(upload_id: str):
+    """Hand a failed completion back to pending so it can be retried"""
+    try:
+        with query_budget("submission"):
+            await db.chunked_uploads.update_one(
+                {"id": upload_id, "status": "storing"}, {"$set": {"status": "pending", "storing_until": None}}
+            )
+    except Exception as e:
+        logger.error("Failed to release chunked upload %s: %s", upload_id, e)
+
+async def release_chunked_upload(upload_id: str):
+    """Undo claim_chunked_upload so a retried submission can attach the upload again"""
+    try:
+        with query_budget("submission"):
+            await db.chunked_uploads.update_one({"id": upload_id, "status": "attached"}, {"$set": {"status": "complete"}})
+    except Exception as e:
+        logger.error("Failed to release chunked upload %s: %s", upload_id, e)
+
+async def insert_submission(collection: str, document: dict, claimed_upload: Optional[str]):
+    """Insert a registration or partnership; a chunked upload it claimed is released if that fails"""
+    try:
+        with tracer.start_as_current_span(f"mongo.insert_one {collection}"), query_budget("submission"), sync.write_budget():
+            await db[collection].insert_one({**prepare_for_mongo(document), **await sync.sync_fields(db, collection)})
+    except BaseException:
+        if claimed_upload:
+            await asyncio.shield(release_chunked_upload(claimed_upload))
+        raise
+
+
 # Email templates
 def send_registration_confirmation(email: str, full_name: str, program: str):
     subject = "Registration Confirmation - Word of Hope International Bible College"
@@ -231,6 +929,27 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "whibc-api"}
 
+@api_router.get("/ready")
+async def readiness_check():
+    """Readiness probe: pings Mongo and reports round-trip latency and pool usage"""
+    if not app.state.ready:
+        return JSONResponse(status_code=503, content={"status": "warming_up", "service": "whibc-api"})
+    started = time.perf_counter()
+    try:
+        await asyncio.wait_for(db.command("ping"), timeout=READY_PING_TIMEOUT)
+    except Exception as e:
+        logger.warning("Readiness check failed: %s", e)
+        return JSONResponse(status_code=503, content={"status": "unavailable", "service": "whibc-api", "mongo": {"error": "Database unreachable"}})
+    return {
+        "status": "ready",
+        "service": "whibc-api",
+        "mongo": {
+            "latency_ms": round((time.perf_counter() - started) * 1000, 2),
+            "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "pools": pool_monitor.snapshot(),
+        }
+    }
+
 # Admin Auth
 @api_router.post("/admin/login", response_model=AdminLoginResponse)
 async def admin_login(credentials: AdminLogin):
@@ -254,16 +973,136 @@ async def admin_login(credentials: AdminLogin):
     except HTTPException:
         raise
     except Exception as e:
-        logging.error(f"Admin login error: {str(e)}")
+        logger.error("Admin login error: %s", e)
         raise HTTPException(status_code=500, detail="Login failed")
 
 @api_router.post("/admin/verify-token")
 async def verify_admin_token(current_user: str = Depends(verify_token)):
     return {"valid": True, "username": current_user, "role": "administrator"}
 
+# Chunked uploads
+@api_router.post("/uploads/init", response_model=ChunkedUploadStatus)
+async def init_chunked_upload(upload_init: ChunkedUploadInit):
+    if upload_init.kind not in UPLOAD_KINDS:
+        raise HTTPException(status_code=400, detail="Unsupported upload kind")
+    check_upload_filename(upload_init.filename)
+    if upload_init.total_size > UPLOAD_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"File exceeds the {UPLOAD_MAX_BYTES // (1024 * 1024)} MB limit")
+    try:
+        upload = ChunkedUpload(**upload_init.dict())
+        UPLOAD_TMP_DIR.mkdir(parents=True, exist_ok=True)
+        chunk_path(upload.id).touch()
+        with query_budget("submission"):
+            await db.chunked_uploads.insert_one(upload.dict())
+        return upload_status(upload.dict())
+    except Exception as e:
+        logger.error("Chunked upload init error: %s", e)
+        raise db_failure(e, "Failed to start upload")
+
+@api_router.get("/uploads/{upload_id}", response_model=ChunkedUploadStatus)
+async def get_chunked_upload(upload_id: str):
+    return upload_status(await get_active_upload(upload_id))
+
+@api_router.put("/uploads/{upload_id}", response_model=ChunkedUploadStatus)
+async def append_chunk(upload_id: str, request: Request, offset: int):
+    """Append one chunk at `offset`; the X-Chunk-SHA256 header must match the chunk body"""
+    if int(request.headers.get('content-length') or 0) > UPLOAD_CHUNK_MAX_BYTES:
+        raise HTTPException(status_code=413, detail="Chunk too large")
+    upload = await get_active_upload(upload_id)
+    if upload['status'] != "pending":
+        raise HTTPException(status_code=409, detail="Upload already completed")
+    # Content-Length may be absent (chunked transfer encoding), so enforce the limit while reading too
+    chunk = bytearray()
+    async for block in request.stream():
+        chunk += block
+        if len(chunk) > UPLOAD_CHUNK_MAX_BYTES:
+            raise HTTPException(status_code=413, detail="Chunk too large")
+    chunk = bytes(chunk)
+    if offset + len(chunk) <= upload['received']:
+        # Retried chunk the server already has
+        return upload_status(upload)
+    if offset != upload['received']:
+        raise HTTPException(status_code=409, detail=f"Expected offset {upload['received']}")
+    if offset + len(chunk) > upload['total_size']:
+        raise HTTPException(status_code=400, detail="Chunk exceeds declared file size")
+    if hashlib.sha256(chunk).hexdigest() != request.headers.get('x-chunk-sha256', '').lower():
+        raise HTTPException(status_code=422, detail="Chunk checksum mismatch")
+    try:
+        async with aiofiles.open(chunk_path(upload_id), 'r+b') as f:
+            await f.seek(offset)
+            await f.write(chunk)
+            await f.truncate()
+        with query_budget("submission"):
+            updated = await db.chunked_uploads.find_one_and_update(
+                {"id": upload_id, "received": offset},
+                {"$set": {"received": offset + len(chunk)}},
+                return_document=ReturnDocument.AFTER
+            )
+        if not updated:
+            raise HTTPException(status_code=409, detail="Concurrent write for this upload")
+        return upload_status(updated)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Chunk append error: %s", e)
+        raise db_failure(e, "Failed to store chunk")
+
+@api_router.post("/uploads/{upload_id}/complete", response_model=ChunkedUploadStatus)
+async def complete_chunked_upload(upload_id: str):
+    upload = await get_active_upload(upload_id)
+    if upload['status'] not in ("pending", "storing"):
+        return upload_status(upload)
+    if upload['received'] != upload['total_size']:
+        raise HTTPException(status_code=409, detail=f"Upload incomplete: {upload['received']} of {upload['total_size']} bytes")
+    # Only one request stores the file; a retry while it is being stored just gets the status
+    now = datetime.now(timezone.utc)
+    try:
+        with query_budget("submission"):
+            upload = await db.chunked_uploads.find_one_and_update(
+                {"id": upload_id, "$or": [{"status": "pending"}, {"status": "storing", "storing_until": {"$lt": now}}]},
+                {"$set": {"status": "storing", "storing_until": now + timedelta(seconds=UPLOAD_STORE_LEASE_SECONDS)}},
+                return_document=ReturnDocument.AFTER
+            )
+    except Exception as e:
+        logger.error("Chunked upload completion error: %s", e)
+        raise db_failure(e, "Failed to complete upload")
+    if not upload:
+        return upload_status(await get_active_upload(upload_id))
+
+    path = chunk_path(upload_id)
+    try:
+        if upload.get('sha256'):
+            digest = hashlib.sha256()
+            async with aiofiles.open(path, 'rb') as f:
+                while block := await f.read(1024 * 1024):
+                    digest.update(block)
+            if digest.hexdigest() != upload['sha256'].lower():
+                raise HTTPException(status_code=422, detail="File checksum mismatch")
+        # The .part file stays in place until it is stored, so a failed completion can be retried
+        document_filename, document_path = await store_file(path, upload['kind'])
+        with query_budget("submission"):
+            updated = await db.chunked_uploads.find_one_and_update(
+                {"id": upload_id, "status": "storing"},
+                {"$set": {"status": "complete", "document_filename": document_filename, "document_path": document_path}},
+                return_document=ReturnDocument.AFTER
+            )
+        if updated is None:
+            # Our lease ran out and another request took over the completion
+            return upload_status(await get_active_upload(upload_id))
+        path.unlink(missing_ok=True)
+        return upload_status(updated)
+    except BaseException as e:
+        await asyncio.shield(release_stored_upload(upload_id))
+        if isinstance(e, HTTPException) or not isinstance(e, Exception):
+            raise
+        logger.error("Chunked upload completion error: %s", e)
+        raise db_failure(e, "Failed to complete upload")
+
 # Student Registration
 @api_router.post("/register-student", response_model=EmailResponse)
+@idempotency.guard("register-student")
 async def register_student(
+    request: Request,
     full_name: str = Form(...),
     date_of_birth: str = Form(...),
     gender: str = Form(...),
@@ -274,19 +1113,25 @@ async def register_student(
     program_applied: str = Form(...),
     study_mode: str = Form(...),
     document: Optional[UploadFile] = File(None),
+    upload_id: Optional[str] = Form(None),
     background_tasks: BackgroundTasks = BackgroundTasks()
 ):
+    trace_request_body(request, "register_student.parse_form")
     try:
-        existing_student = await db.student_registrations.find_one({"email": email})
-        existing_partnership = await db.partnerships.find_one({"email": email})
+        existing_student, existing_partnership = await find_existing_email(email)
         if existing_student:
             raise HTTPException(status_code=400, detail=f"Email {email} is already registered as a student.")
         if existing_partnership:
             raise HTTPException(status_code=400, detail=f"Email {email} is already registered for a partnership.")
 
-        document_filename, document_path = None, None
+        document_filename, document_path, claimed_upload = None, None, None
         if document and document.filename:
-            document_filename, document_path = await save_uploaded_file(document, "student_doc")
+            with tracer.start_as_current_span("save_uploaded_file"):
+                document_filename, document_path = await save_uploaded_file(document, "student_doc")
+        elif upload_id:
+            with tracer.start_as_current_span("claim_chunked_upload"):
+                document_filename, document_path = await claim_chunked_upload(upload_id, "student_doc")
+            claimed_upload = upload_id
 
         registration_data = {
             "full_name": full_name, "date_of_birth": date_of_birth, "gender": gender,
@@ -295,18 +1140,22 @@ async def register_student(
             "study_mode": study_mode, "document_filename": document_filename, "document_path": document_path
         }
         student_obj = StudentRegistration(**registration_data)
-        await db.student_registrations.insert_one(prepare_for_mongo(student_obj.dict()))
-        background_tasks.add_task(send_registration_confirmation, email, full_name, program_applied)
+        await insert_submission("student_registrations", student_obj.dict(), claimed_upload)
+        await cache_bus.publish({"email": [email], "dashboard": []})
+        with tracer.start_as_current_span("schedule_email"):
+            background_tasks.add_task(send_registration_confirmation, email, full_name, program_applied)
         return EmailResponse(status="success", message="Registration submitted successfully! Check your email for confirmation.")
     except HTTPException:
         raise
     except Exception as e:
-        logging.error(f"Student registration error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Registration failed. Please try again.")
+        logger.error("Student registration error: %s", e)
+        raise db_failure(e, "Registration failed. Please try again.")
 
 # Partnership
 @api_router.post("/submit-partnership", response_model=EmailResponse)
+@idempotency.guard("submit-partnership")
 async def submit_partnership(
+    request: Request,
     organization_name: str = Form(...),
     contact_person: str = Form(...),
     email: EmailStr = Form(...),
@@ -314,19 +1163,25 @@ async def submit_partnership(
     partnership_type: str = Form(...),
     message: str = Form(...),
     document: Optional[UploadFile] = File(None),
+    upload_id: Optional[str] = Form(None),
     background_tasks: BackgroundTasks = BackgroundTasks()
 ):
+    trace_request_body(request, "submit_partnership.parse_form")
     try:
-        existing_student = await db.student_registrations.find_one({"email": email})
-        existing_partnership = await db.partnerships.find_one({"email": email})
+        existing_student, existing_partnership = await find_existing_email(email)
         if existing_partnership:
             raise HTTPException(status_code=400, detail=f"Email {email} is already registered for a partnership.")
         if existing_student:
             raise HTTPException(status_code=400, detail=f"Email {email} is already registered as a student.")
 
-        document_filename, document_path = None, None
+        document_filename, document_path, claimed_upload = None, None, None
         if document and document.filename:
-            document_filename, document_path = await save_uploaded_file(document, "partnership_doc")
+            with tracer.start_as_current_span("save_uploaded_file"):
+                document_filename, document_path = await save_uploaded_file(document, "partnership_doc")
+        elif upload_id:
+            with tracer.start_as_current_span("claim_chunked_upload"):
+                document_filename, document_path = await claim_chunked_upload(upload_id, "partnership_doc")
+            claimed_upload = upload_id
 
         partnership_data = {
             "organization_name": organization_name, "contact_person": contact_person,
@@ -334,38 +1189,114 @@ async def submit_partnership(
             "message": message, "document_filename": document_filename, "document_path": document_path
         }
         partnership_obj = Partnership(**partnership_data)
-        await db.partnerships.insert_one(prepare_for_mongo(partnership_obj.dict()))
-        background_tasks.add_task(send_partnership_acknowledgment, email, organization_name, partnership_type)
+        await insert_submission("partnerships", partnership_obj.dict(), claimed_upload)
+        await cache_bus.publish({"email": [email], "dashboard": []})
+        with tracer.start_as_current_span("schedule_email"):
+            background_tasks.add_task(send_partnership_acknowledgment, email, organization_name, partnership_type)
         return EmailResponse(status="success", message="Partnership application submitted successfully! We'll contact you soon.")
     except HTTPException:
         raise
     except Exception as e:
-        logging.error(f"Partnership submission error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Partnership submission failed. Please try again.")
+        logger.error("Partnership submission error: %s", e)
+        raise db_failure(e, "Partnership submission failed. Please try again.")
+
+# Admin: delta sync for the registration/partnership lists (see sync.py)
+SYNC_PAGE_SIZE = 500
+
+class RegistrationChanges(BaseModel):
+    cursor: int
+    more: bool
+    changes: List[StudentRegistration]
+    deleted: List[str]
+
+class PartnershipChanges(BaseModel):
+    cursor: int
+    more: bool
+    changes: List[Partnership]
+    deleted: List[str]
+
+async def synced_list(request: Request, response: Response, collection: str, model, changes_model,
+                      since: Optional[int], limit: int):
+    """Changes after `since` if given, else the full list with an ETag and the cursor to sync from"""
+    tag = operation_tag()
+    if since is not None:
+        changed, deleted, cursor, more = await until_disconnect(
+            request, sync.changes_since(db, collection, since, max(1, min(limit, SYNC_PAGE_SIZE)), comment=tag), tag=tag)
+        return changes_model(cursor=cursor, more=more, changes=[model(**doc) for doc in changed], deleted=deleted)
+
+    response.headers["Cache-Control"] = "private, no-cache"
+    version = await sync.list_version(db, collection)
+    if version is not None:
+        etag = f'W/"{collection}-{version}"'
+        if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "private, no-cache"})
+        response.headers["ETag"] = etag
+    cursor = db[collection].find(comment=tag).sort("created_at", -1)
+    docs = await until_disconnect(request, cursor.to_list(1000), [cursor], tag)
+    response.headers["X-Sync-Cursor"] = str(sync.settled_cursor(sorted((doc for doc in docs if "seq" in doc), key=lambda doc: doc["seq"])))
+    return [model(**doc) for doc in docs]
+
+async def delete_synced(collection: str, record_id: str, not_found: str):
+    with tracer.start_as_current_span(f"mongo.find_one_and_delete {collection}"), query_budget("admin"):
+        deleted = await sync.delete_with_tombstone(db, collection, record_id)
+    if deleted is None:
+        raise HTTPException(status_code=404, detail=not_found)
+    await cache_bus.publish({"email": [deleted["email"]], "dashboard": []})
 
 # Admin: Registrations
-@api_router.get("/registrations", response_model=List[StudentRegistration])
-async def get_registrations(current_user: str = Depends(verify_token)):
+@api_router.get("/registrations", response_model=Union[List[StudentRegistration], RegistrationChanges])
+async def get_registrations(request: Request, response: Response, since: Optional[int] = None,
+                            limit: int = SYNC_PAGE_SIZE, current_user: str = Depends(verify_token)):
+    try:
+        with query_budget("admin"):
+            return await synced_list(request, response, "student_registrations", StudentRegistration,
+                                     RegistrationChanges, since, limit)
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Get registrations error: %s", e)
+        raise db_failure(e, "Failed to fetch registrations")
+
+@api_router.delete("/registrations/{registration_id}")
+async def delete_registration(registration_id: str, current_user: str = Depends(verify_token)):
     try:
-        registrations = await db.student_registrations.find().sort("created_at", -1).to_list(1000)
-        return [StudentRegistration(**reg) for reg in registrations]
+        await delete_synced("student_registrations", registration_id, "Registration not found")
+        return {"status": "success", "message": "Registration deleted successfully"}
+    except HTTPException:
+        raise
     except Exception as e:
-        logging.error(f"Get registrations error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to fetch registrations")
+        logger.error("Registration delete error: %s", e)
+        raise db_failure(e, "Failed to delete registration")
 
 # Admin: Partnerships
-@api_router.get("/partnerships", response_model=List[Partnership])
-async def get_partnerships(current_user: str = Depends(verify_token)):
+@api_router.get("/partnerships", response_model=Union[List[Partnership], PartnershipChanges])
+async def get_partnerships(request: Request, response: Response, since: Optional[int] = None,
+                           limit: int = SYNC_PAGE_SIZE, current_user: str = Depends(verify_token)):
     try:
-        partnerships = await db.partnerships.find().sort("created_at", -1).to_list(1000)
-        return [Partnership(**p) for p in partnerships]
+        with query_budget("admin"):
+            return await synced_list(request, response, "partnerships", Partnership,
+                                     PartnershipChanges, since, limit)
+    except HTTPException:
+        raise
     except Exception as e:
-        logging.error(f"Get partnerships error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to fetch partnerships")
+        logger.error("Get partnerships error: %s", e)
+        raise db_failure(e, "Failed to fetch partnerships")
+
+@api_router.delete("/partnerships/{partnership_id}")
+async def delete_partnership(partnership_id: str, current_user: str = Depends(verify_token)):
+    try:
+        await delete_synced("partnerships", partnership_id, "Partnership not found")
+        return {"status": "success", "message": "Partnership deleted successfully"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Partnership delete error: %s", e)
+        raise db_failure(e, "Failed to delete partnership")
 
 # Gallery
 @api_router.post("/gallery/upload")
 async def upload_gallery_image(
+    request: Request,
     title: str = Form(...),
     description: str = Form(...),
     category: str = Form(...),
@@ -373,95 +1304,378 @@ async def upload_gallery_image(
     current_user: str = Depends(verify_token)
 ):
     try:
-        filename, file_path = await save_uploaded_file(image, "gallery")
-        gallery_item = GalleryImage(title=title, description=description, filename=filename, path=file_path, category=category)
-        await db.gallery.insert_one(prepare_for_mongo(gallery_item.dict()))
-        return {"status": "success", "message": "Image uploaded successfully", "filename": filename, "url": file_path}
+        trace_request_body(request, "upload_gallery_image.parse_form")
+        gallery_item = await create_gallery_item(image, title, description, category)
+        try:
+            with tracer.start_as_current_span("mongo.insert_one gallery"), query_budget("admin"):
+                await db.gallery.insert_one(prepare_for_mongo(gallery_item.dict()))
+        except Exception as e:
+            # Keep the files only if the document may exist after all
+            if await unsaved_gallery_items([gallery_item], e):
+                await discard_gallery_items([gallery_item])
+            raise
+        await cache_bus.publish({"gallery": [], "dashboard": []})
+        return {
+            "status": "success", "message": "Image uploaded successfully", "filename": gallery_item.filename, "url": gallery_item.path,
+            **gallery_item.dict(include={"variants", "srcset", "width", "height", "dominant_color", "placeholder"})
+        }
+    except HTTPException:
+        raise
     except Exception as e:
-        logging.error(f"Gallery upload error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to upload image")
+        logger.error("Gallery upload error: %s", e)
+        raise db_failure(e, "Failed to upload image")
+
+@api_router.post("/gallery/upload-batch")
+async def upload_gallery_batch(
+    request: Request,
+    category: str = Form(...),
+    description: str = Form(""),
+    title: Optional[str] = Form(None),
+    images: List[UploadFile] = File(...),
+    current_user: str = Depends(verify_token)
+):
+    """Upload many images with shared metadata; titles default to each file's name"""
+    if len(images) > GALLERY_BATCH_MAX_FILES:
+        raise HTTPException(status_code=413, detail=f"At most {GALLERY_BATCH_MAX_FILES} images per batch")
+    # Uploads stay spooled to disk until their turn, so at most
+    # GALLERY_BATCH_CONCURRENCY files are held in memory at once
+    trace_request_body(request, "upload_gallery_batch.parse_form")
+    semaphore = asyncio.Semaphore(GALLERY_BATCH_CONCURRENCY)
+
+    async def upload_one(image: UploadFile):
+        async with semaphore:
+            try:
+                with tracer.start_as_current_span("upload_one", attributes={"file": image.filename or ""}):
+                    return await create_gallery_item(image, title or Path(image.filename or "image").stem, description, category)
+            finally:
+                await image.close()
+
+    outcomes = await asyncio.gather(*(upload_one(image) for image in images), return_exceptions=True)
+    items = [item for item in outcomes if isinstance(item, GalleryImage)]
+    # ids of stored items whose documents were not saved, mapped to the reason
+    unsaved: Dict[str, str] = {}
+    if items:
+        try:
+            with tracer.start_as_current_span("mongo.insert_many gallery"), query_budget("admin"):
+                await db.gallery.insert_many([prepare_for_mongo(item.dict()) for item in items], ordered=False)
+        except Exception as e:
+            logger.error("Gallery batch insert error: %s", e)
+            failed = await unsaved_gallery_items(items, e)
+            if failed is None:
+                # Unknown which were saved; keep every file rather than risk entries pointing at deleted ones
+                unsaved = {item.id: "The image may not have been saved. Check the gallery before retrying." for item in items}
+            else:
+                await discard_gallery_items(failed)
+                unsaved = {item.id: db_failure(e, "Failed to save image").detail for item in failed}
+        if len(unsaved) < len(items):
+            await cache_bus.publish({"gallery": [], "dashboard": []})
+
+    results = []
+    for image, outcome in zip(images, outcomes):
+        if isinstance(outcome, GalleryImage) and outcome.id in unsaved:
+            results.append({"file": image.filename, "status": "error", "detail": unsaved[outcome.id]})
+        elif isinstance(outcome, GalleryImage):
+            results.append({"file": image.filename, "status": "success", "id": outcome.id, "url": outcome.path})
+        else:
+            logger.error("Gallery batch upload error for %s: %s", image.filename, outcome)
+            detail = outcome.detail if isinstance(outcome, HTTPException) else "Failed to upload image"
+            results.append({"file": image.filename, "status": "error", "detail": detail})
+    uploaded = len(items) - len(unsaved)
+    return {
+        "status": "success" if uploaded == len(images) else "partial" if uploaded else "error",
+        "uploaded": uploaded, "failed": len(images) - uploaded, "results": results
+    }
 
 @api_router.get("/gallery")
-async def get_gallery():
+async def get_gallery(request: Request):
     try:
-        images = await db.gallery.find().sort("created_at", -1).to_list(1000)
-        return [GalleryImage(**img) for img in images]
+        gallery = gallery_cache.get("gallery")
+        if gallery is None:
+            with tracer.start_as_current_span("load_gallery"), query_budget("public"):
+                gallery = await read_coalescer.do("gallery", load_gallery)
+        return gallery.response(request.headers.get("accept-encoding", ""))
     except Exception as e:
-        logging.error(f"Get gallery error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to fetch gallery")
+        logger.error("Get gallery error: %s", e)
+        raise db_failure(e, "Failed to fetch gallery")
 
 @api_router.delete("/gallery/{image_id}")
 async def delete_gallery_image(image_id: str, current_user: str = Depends(verify_token)):
     try:
-        image = await db.gallery.find_one({"id": image_id})
+        with tracer.start_as_current_span("mongo.find_one gallery"), query_budget("admin"):
+            image = await db.gallery.find_one({"id": image_id})
         if not image:
             raise HTTPException(status_code=404, detail="Image not found")
-        # Delete from Cloudinary if it has a public_id
+        # Delete the original and its variants from Cloudinary if it has a public_id
         if image.get('filename'):
-            try:
-                cloudinary.uploader.destroy(image['filename'])
-            except Exception:
-                pass
-        result = await db.gallery.delete_one({"id": image_id})
+            public_ids = [image['filename']] + variant_public_ids(image['filename'], image.get('variants', {}))
+            with tracer.start_as_current_span("delete_stored_files", attributes={"count": len(public_ids)}):
+                await run_in_threadpool(delete_stored_files, public_ids)
+        with tracer.start_as_current_span("mongo.delete_one gallery"), query_budget("admin"):
+            result = await db.gallery.delete_one({"id": image_id})
+        await cache_bus.publish({"gallery": [], "dashboard": []})
         if result.deleted_count == 0:
             raise HTTPException(status_code=404, detail="Image not found")
         return {"status": "success", "message": "Image deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
-        logging.error(f"Gallery delete error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to delete image")
+        logger.error("Gallery delete error: %s", e)
+        raise db_failure(e, "Failed to delete image")
+
+# Metrics
+@api_router.get("/admin/metrics")
+async def admin_metrics(current_user: str = Depends(verify_token)):
+    return {
+        "mongo": {"commands": command_monitor.snapshot(), "pools": pool_monitor.snapshot(), "slow_query_ms": SLOW_QUERY_MS},
+        "cache_bus": {"worker": cache_bus.worker_id, "received": cache_bus.received},
+        "coalescing": read_coalescer.snapshot(),
+        "admission": {name: limiter.snapshot() for name, limiter in admission_limiters.items()}
+    }
+
+# Profiling
+@api_router.post("/admin/profile")
+async def profile_process(seconds: float = 10, current_user: str = Depends(verify_token)):
+    """Sample the running worker for `seconds` and return a speedscope profile"""
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILE_MAX_SECONDS}")
+    try:
+        profile = await profiling.sample_process(seconds)
+    except profiling.ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    filename = f"whibc-{datetime.now(timezone.utc):%Y%m%dT%H%M%S}.speedscope.json"
+    return Response(content=profile, media_type="application/json", headers={"Content-Disposition": f'attachment; filename="{filename}"'})
+
+@api_router.post("/admin/profile/token")
+async def create_profile_token(current_user: str = Depends(verify_token)):
+    """Signed X-Profile-Token value; requests carrying it are profiled individually"""
+    return {
+        "header": "X-Profile-Token",
+        "token": profiling.create_profile_token(PROFILING_SECRET, PROFILE_TOKEN_MINUTES * 60),
+        "expires_in": PROFILE_TOKEN_MINUTES * 60
+    }
+
+@api_router.get("/admin/profiles")
+async def list_request_profiles(current_user: str = Depends(verify_token)):
+    return profiling.list_profiles()
+
+@api_router.get("/admin/profiles/{profile_id}")
+async def get_request_profile(profile_id: str, current_user: str = Depends(verify_token)):
+    profile = profiling.get_profile(profile_id)
+    if not profile:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return Response(content=profile["speedscope"], media_type="application/json",
+                    headers={"Content-Disposition": f'attachment; filename="request-{profile_id}.speedscope.json"'})
+
+# Memory diagnostics
+def memory_group_by(group_by: str) -> str:
+    if group_by not in memory_diagnostics.GROUP_BY:
+        raise HTTPException(status_code=400, detail=f"group_by must be one of {', '.join(memory_diagnostics.GROUP_BY)}")
+    return group_by
+
+def memory_snapshot_or_404(name: str):
+    snapshot = memory_diagnostics.get_snapshot(name)
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"Snapshot {name} not found")
+    return snapshot
+
+@api_router.get("/admin/memory")
+async def memory_overview(current_user: str = Depends(verify_token)):
+    models = (StudentRegistration, Partnership, GalleryImage, ChunkedUpload)
+    return {
+        "rss_bytes": memory_diagnostics.rss_bytes(),
+        "gc": memory_diagnostics.gc_stats(),
+        "tracemalloc": memory_diagnostics.tracemalloc_status(),
+        "model_instances": await run_in_threadpool(memory_diagnostics.object_counts, models),
+    }
+
+@api_router.post("/admin/memory/tracemalloc/start")
+async def start_tracemalloc(frames: int = 1, current_user: str = Depends(verify_token)):
+    memory_diagnostics.start(max(1, min(frames, 50)))
+    return memory_diagnostics.tracemalloc_status()
+
+@api_router.post("/admin/memory/tracemalloc/stop")
+async def stop_tracemalloc(current_user: str = Depends(verify_token)):
+    memory_diagnostics.stop()
+    return memory_diagnostics.tracemalloc_status()
+
+@api_router.post("/admin/memory/snapshots")
+async def take_memory_snapshot(name: Optional[str] = None, group_by: str = "lineno", limit: int = 25, current_user: str = Depends(verify_token)):
+    group_by = memory_group_by(group_by)
+    name = name or f"{datetime.now(timezone.utc):%H%M%S}"
+    try:
+        snapshot = await run_in_threadpool(memory_diagnostics.take_snapshot, name)
+    except RuntimeError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {"name": name, "top": await run_in_threadpool(memory_diagnostics.top_stats, snapshot, group_by, limit)}
+
+@api_router.get("/admin/memory/snapshots/{name}")
+async def get_memory_snapshot(name: str, group_by: str = "lineno", limit: int = 25, current_user: str = Depends(verify_token)):
+    snapshot = memory_snapshot_or_404(name)
+    return {"name": name, "top": await run_in_threadpool(memory_diagnostics.top_stats, snapshot, memory_group_by(group_by), limit)}
+
+@api_router.get("/admin/memory/diff")
+async def diff_memory_snapshots(base: str, target: str, group_by: str = "lineno", limit: int = 25, current_user: str = Depends(verify_token)):
+    stats = await run_in_threadpool(
+        memory_diagnostics.diff, memory_snapshot_or_404(base), memory_snapshot_or_404(target), memory_group_by(group_by), limit
+    )
+    return {"base": base, "target": target, "top": stats}
 
 # Dashboard
 @api_router.get("/admin/dashboard")
-async def admin_dashboard(current_user: str = Depends(verify_token)):
+async def admin_dashboard(request: Request, current_user: str = Depends(verify_token)):
+    dashboard = dashboard_cache.get("dashboard")
+    if dashboard is not None:
+        return dashboard.response(request.headers.get("accept-encoding", ""))
+    version = dashboard_cache.version
     try:
-        total_registrations = await db.student_registrations.count_documents({})
-        total_partnerships = await db.partnerships.count_documents({})
-        total_gallery = await db.gallery.count_documents({})
-        recent_registrations = await db.student_registrations.find().sort("created_at", -1).limit(5).to_list(5)
-        recent_partnerships = await db.partnerships.find().sort("created_at", -1).limit(5).to_list(5)
-        return {
+        with query_budget("admin"):
+            tag = operation_tag()
+            registrations_cursor = db.student_registrations.find(comment=tag).sort("created_at", -1).limit(5)
+            partnerships_cursor = db.partnerships.find(comment=tag).sort("created_at", -1).limit(5)
+            (total_registrations, total_partnerships, total_gallery,
+             recent_registrations, recent_partnerships) = await until_disconnect(request, asyncio.gather(
+                db.student_registrations.count_documents({}, comment=tag),
+                db.partnerships.count_documents({}, comment=tag),
+                db.gallery.count_documents({}, comment=tag),
+                registrations_cursor.to_list(5),
+                partnerships_cursor.to_list(5),
+            ), [registrations_cursor, partnerships_cursor], tag)
+        dashboard = JsonPayload({
             "stats": {"total_registrations": total_registrations, "total_partnerships": total_partnerships, "total_gallery": total_gallery},
             "recent_registrations": [StudentRegistration(**reg) for reg in recent_registrations],
             "recent_partnerships": [Partnership(**p) for p in recent_partnerships]
-        }
+        })
+        await run_in_threadpool(dashboard.precompress)
+        dashboard_cache.set("dashboard", dashboard, version)
+        return dashboard.response(request.headers.get("accept-encoding", ""))
+    except HTTPException:
+        raise
     except Exception as e:
-        logging.error(f"Admin dashboard error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to fetch dashboard data")
+        logger.error("Admin dashboard error: %s", e)
+        raise db_failure(e, "Failed to fetch dashboard data")
+
+# Admin: several GET endpoints in one request (see batch.py)
+BATCH_MAX_QUERIES = int(os.environ.get('BATCH_MAX_QUERIES', 10))
+
+class BatchQuery(BaseModel):
+    id: str
+    path: str
+    params: Dict[str, int] = {}
+    if_none_match: Optional[str] = None
+
+class BatchRequest(BaseModel):
+    queries: List[BatchQuery] = Field(..., min_length=1, max_length=BATCH_MAX_QUERIES)
+
+BATCH_ROUTES = {
+    "/api/admin/dashboard": batch.BatchRoute(admin_dashboard),
+    "/api/registrations": batch.BatchRoute(get_registrations, ("since", "limit")),
+    "/api/partnerships": batch.BatchRoute(get_partnerships, ("since", "limit")),
+    "/api/gallery": batch.BatchRoute(get_gallery),
+}
+
+@api_router.post("/admin/batch")
+async def admin_batch(batch_request: BatchRequest, request: Request, current_user: str = Depends(verify_token)):
+    """Run up to BATCH_MAX_QUERIES admin reads concurrently, each with its own status.
+
+    Returns {"results": [{"id", "status", "headers", "body"}, ...]} in request order.
+    """
+    return await batch.execute(request, batch_request.queries, BATCH_ROUTES, {"current_user": current_user})
+
+# Live activity feed
+change_feed = ChangeFeed(lambda: db, {
+    "student_registrations": lambda doc: StudentRegistration(**doc).model_dump(mode="json"),
+    "partnerships": lambda doc: Partnership(**doc).model_dump(mode="json"),
+    "gallery": lambda doc: GalleryImage(**with_srcset(doc)).model_dump(mode="json"),
+})
+
+@api_router.post("/admin/events/ticket")
+async def create_events_ticket(current_user: str = Depends(verify_token)):
+    """Short-lived ticket for opening /admin/events, which cannot take an Authorization header"""
+    ticket = create_access_token({"sub": current_user, "purpose": EVENTS_TICKET_PURPOSE},
+                                 timedelta(seconds=EVENTS_TICKET_SECONDS))
+    return {"ticket": ticket, "expires_in": EVENTS_TICKET_SECONDS}
+
+@api_router.get("/admin/events")
+async def admin_events(request: Request, current_user: str = Depends(verify_stream_token)):
+    """Server-Sent Events stream of registration, partnership and gallery changes.
+
+    A `resync` event means changes may have been missed and the client should
+    refetch; deletes only carry the Mongo document key.
+    """
+    async def stream():
+        async with change_feed.subscribe() as queue:
+            yield "retry: 5000\nevent: ready\ndata: {}\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), EVENTS_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    # Keeps proxies from closing an idle connection
+                    yield ": heartbeat\n\n"
+                    continue
+                yield encode_event(event)
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
 
 # Email check
+async def lookup_email(email: str) -> dict:
+    version = email_cache.version
+    student_exists = await db.student_registrations.find_one({"email": email})
+    partnership_exists = await db.partnerships.find_one({"email": email})
+    result = {
+        "email": email,
+        "available": not (student_exists or partnership_exists),
+        "student_registered": bool(student_exists),
+        "partnership_registered": bool(partnership_exists)
+    }
+    email_cache.set(email, result, version)
+    return result
+
 @api_router.get("/check-email/{email}")
 async def check_email_availability(email: EmailStr):
+    result = email_cache.get(email)
+    if result is not None:
+        return result
     try:
-        student_exists = await db.student_registrations.find_one({"email": email})
-        partnership_exists = await db.partnerships.find_one({"email": email})
-        return {
-            "email": email,
-            "available": not (student_exists or partnership_exists),
-            "student_registered": bool(student_exists),
-            "partnership_registered": bool(partnership_exists)
-        }
+        with query_budget("public"):
+            return await read_coalescer.do(f"email:{email}", lambda: lookup_email(email), metric="check_email")
     except Exception as e:
-        logging.error(f"Email check error: {str(e)}")
-        raise HTTPException(status_code=500, detail="Failed to check email availability")
+        logger.error("Email check error: %s", e)
+        raise db_failure(e, "Failed to check email availability")
 
 
 # Include router
 app.include_router(api_router)
 
+if STORAGE_BACKEND == 'local':
+    LOCAL_UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    app.mount(LOCAL_UPLOAD_URL, UploadedFiles(directory=LOCAL_UPLOAD_DIR), name="uploads")
+
+# Optional single-box mode: serve the built frontend (and the repo's images/) from this app
+if STATIC_SITE_DIR:
+    from static_site import StaticSite
+    app.mount("/", StaticSite(Path(STATIC_SITE_DIR), {"images": ROOT_DIR.parent / "images"}), name="site")
+
+app.add_middleware(CompressionMiddleware)
+if ADMISSION_CONTROL:
+    app.add_middleware(AdmissionMiddleware, limiters=admission_limiters)
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=os.environ.get('CORS_ORIGINS', '*').split(','),
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id", "X-Profile-Id", "X-Request-ID", "Idempotent-Replayed", "X-Sync-Cursor"],
 )
+app.add_middleware(ProfilingMiddleware, secret=PROFILING_SECRET)
+app.add_middleware(TracingMiddleware)
+app.add_middleware(RequestIdMiddleware)
 
-# Logging
-logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-logger = logging.getLogger(__name__)
+IMPORT_DURATION_MS = (time.perf_counter() - IMPORT_STARTED) * 1000
 
-@app.on_event("shutdown")
-async def shutdown_db_client():
-    client.close()
+async def run_startup_migrations():
+    import migrations
+    try:
+        await migrations.run_migrations(db)
+    except Exception as e:
+        logger.error("Startup migrations failed: %s", e)
@@ -0,0 +1,108 @@
+"""Serves the built frontend from the API process (STATIC_SITE_DIR).
+
+- Content-hashed filenames (main.3f2a1b9c.js) are cached for a year as
+  `immutable`; everything else must revalidate, using ETag/Last-Modified.
+- Precompressed `.br`/`.gz` siblings written at build time are served when
+  the client accepts them, so nothing is compressed per request.
+- Extension-less paths that match no file get index.html (SPA routing);
+  missing assets get the site's 404.html if it has one.
+"""
+import mimetypes
+import re
+from email.utils import formatdate, parsedate_to_datetime
+from pathlib import Path
+
+from starlette.responses import FileResponse, JSONResponse, PlainTextResponse, Response
+
+from compression import accepted_encodings
+
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.(?:chunk\.)?\w+$")
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+PRECOMPRESSED = {"br": ".br", "gzip": ".gz"}
+
+
+def etag_for(stat, encoding=None) -> str:
+    tag = f"{stat.st_size:x}-{stat.st_mtime_ns:x}"
+    return f'"{tag}-{encoding}"' if encoding else f'"{tag}"'
+
+
+def not_modified(headers, etag: str, mtime: float) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class StaticSite:
+    def __init__(self, directory: Path, extra_dirs: dict = None):
+        self.directory = directory.resolve()
+        # URL prefix -> directory for files kept outside the build (e.g. /images)
+        self.extra_dirs = {prefix: path.resolve() for prefix, path in (extra_dirs or {}).items()}
+
+    def find(self, url_path: str):
+        relative = url_path.lstrip("/") or "index.html"
+        candidates = [(self.directory, relative)]
+        first, _, rest = relative.partition("/")
+        if first in self.extra_dirs and rest:
+            candidates.append((self.extra_dirs[first], rest))
+        for root, name in candidates:
+            path = (root / name).resolve()
+            # Refuse anything that escapes the root (../ or symlinks)
+            if path.is_relative_to(root) and path.is_file():
+                return path
+        return None
+
+    async def __call__(self, scope, receive, send):
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        response = self.respond(scope["method"], scope["path"], headers)
+        await response(scope, receive, send)
+
+    def respond(self, method: str, url_path: str, headers: dict) -> Response:
+        if url_path.startswith("/api/"):
+            return JSONResponse({"detail": "Not Found"}, status_code=404)
+        if method not in ("GET", "HEAD"):
+            return PlainTextResponse("Method Not Allowed", status_code=405, headers={"Allow": "GET, HEAD"})
+
+        path = self.find(url_path)
+        status_code = 200
+        if path is None:
+            if "." not in url_path.rsplit("/", 1)[-1]:
+                path = self.find("/index.html")
+            else:
+                path, status_code = self.find("/404.html"), 404
+            if path is None:
+                return PlainTextResponse("Not Found", status_code=404)
+        return self.file_response(path, status_code, headers)
+
+    def file_response(self, path: Path, status_code: int, headers: dict) -> Response:
+        served, encoding = path, None
+        # Builds often ship only one kind of sibling, so fall back through everything the client accepts
+        for accepted in accepted_encodings(headers.get("accept-encoding", ""), list(PRECOMPRESSED)):
+            sibling = path.parent / (path.name + PRECOMPRESSED[accepted])
+            if sibling.is_file():
+                served, encoding = sibling, accepted
+                break
+
+        stat = served.stat()
+        etag = etag_for(stat, encoding)
+        response_headers = {
+            "Cache-Control": IMMUTABLE if HASHED_NAME.search(path.name) and status_code == 200 else REVALIDATE,
+            "ETag": etag,
+            "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+            "Vary": "Accept-Encoding",
+        }
+        if status_code == 200 and not_modified(headers, etag, stat.st_mtime):
+            return Response(status_code=304, headers=response_headers)
+        if encoding:
+            response_headers["Content-Encoding"] = encoding
+        # media_type from the original name, not the .br/.gz sibling
+        media_type = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+        return FileResponse(served, status_code=status_code, headers=response_headers,
+                            media_type=media_type, stat_result=stat)
@@ -0,0 +1,103 @@
+"""Delta sync for the admin lists.
+
+Every insert, update or delete in a synced collection takes the next value of
+a per-collection counter (`counters` collection) and stores it as `seq` on the
+document, or on a tombstone in `tombstones` for deletes. A client keeps the
+`cursor` from its last sync and asks for `seq > cursor`.
+
+Sequence numbers are handed out before the write lands, so a slow write can
+become visible after a faster one with a higher number. To avoid skipping it,
+the cursor only advances past changes older than SETTLE_SECONDS; newer ones are
+still returned but will be sent again next time, and clients upsert by id.
+Reserving a number and writing it happen under write_budget(), a deadline of
+its own that stays well inside SETTLE_SECONDS however the request budgets
+are configured.
+"""
+from datetime import datetime, timedelta, timezone
+
+import pymongo
+from pymongo import ReturnDocument
+
+SYNCED_COLLECTIONS = ("student_registrations", "partnerships")
+WRITE_SECONDS = 5
+# Twice the write deadline, for writes the server finishes just after the client gave up
+SETTLE_SECONDS = 2 * WRITE_SECONDS
+
+
+def write_budget():
+    """Deadline for reserving a seq and writing the change; caps any longer enclosing budget"""
+    return pymongo.timeout(WRITE_SECONDS)
+
+
+async def next_seq(db, collection: str, count: int = 1) -> int:
+    """Reserve `count` sequence numbers; returns the first"""
+    counter = await db.counters.find_one_and_update(
+        {"_id": collection},
+        {"$inc": {"seq": count}, "$set": {"updated_at": datetime.now(timezone.utc)}},
+        upsert=True, return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"] - count + 1
+
+
+async def list_version(db, collection: str):
+    """The collection's latest seq, or None while its last change may still be in flight"""
+    counter = await db.counters.find_one({"_id": collection})
+    if counter is None:
+        return 0
+    if not is_settled(counter.get("updated_at")):
+        return None
+    return counter["seq"]
+
+
+def is_settled(updated_at) -> bool:
+    if updated_at is None:
+        return True
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return updated_at <= datetime.now(timezone.utc) - timedelta(seconds=SETTLE_SECONDS)
+
+
+def settled_cursor(docs: list, since: int = 0) -> int:
+    """Highest seq in `docs` (sorted by seq) below the first change that may not have settled"""
+    cursor = since
+    for doc in docs:
+        if not is_settled(doc.get("updated_at")):
+            break
+        cursor = doc["seq"]
+    return cursor
+
+
+async def sync_fields(db, collection: str) -> dict:
+    """Fields to $set on a document being inserted or updated; call it and write under write_budget()"""
+    return {"seq": await next_seq(db, collection), "updated_at": datetime.now(timezone.utc)}
+
+
+async def delete_with_tombstone(db, collection: str, record_id: str):
+    """Delete by `id` and leave a tombstone; returns the deleted document or None"""
+    with write_budget():
+        seq = await next_seq(db, collection)
+        deleted = await db[collection].find_one_and_delete({"id": record_id})
+        if deleted is not None:
+            await db.tombstones.insert_one({
+                "collection": collection, "id": record_id, "seq": seq, "updated_at": datetime.now(timezone.utc),
+            })
+    return deleted
+
+
+async def changes_since(db, collection: str, since: int, limit: int, comment: str = None) -> tuple:
+    """Return (changed documents, deleted ids, new cursor, more) for changes after `since`"""
+    query = {"seq": {"$gt": since}}
+    options = {"comment": comment} if comment else {}
+    # One extra from each source tells us whether there is more to fetch
+    changed = await db[collection].find(query, **options).sort("seq", 1).limit(limit + 1).to_list(limit + 1)
+    deleted = await db.tombstones.find(dict(query, collection=collection), **options).sort("seq", 1).limit(limit + 1).to_list(limit + 1)
+    # Merge both streams in seq order and cut at `limit` so the cursor never skips either
+    entries = sorted([(doc["seq"], doc, False) for doc in changed] + [(t["seq"], t, True) for t in deleted],
+                     key=lambda entry: entry[0])
+    entries = entries[:limit]
+    cursor = settled_cursor([doc for _, doc, _ in entries], since)
+    # Later pages are newer still; if this one hasn't fully settled, asking again now gains nothing
+    more = len(changed) + len(deleted) > limit and bool(entries) and cursor == entries[-1][0]
+    return ([doc for _, doc, is_tombstone in entries if not is_tombstone],
+            [doc["id"] for _, doc, is_tombstone in entries if is_tombstone],
+            cursor, more)
@@ -0,0 +1,113 @@
+import asyncio
+
+import pytest
+
+from admission import Limiter, Rejected, classify
+
+
+def scope(method, path):
+    return {"method": method, "path": path}
+
+
+def test_classify():
+    assert classify(scope("GET", "/api/health")) is None
+    assert classify(scope("OPTIONS", "/api/register-student")) is None
+    assert classify(scope("GET", "/api/admin/events")) is None
+    assert classify(scope("GET", "/api/registrations")) == "admin"
+    assert classify(scope("DELETE", "/api/gallery/abc")) == "admin"
+    assert classify(scope("POST", "/api/register-student")) == "submission"
+    assert classify(scope("PUT", "/api/uploads/abc")) == "upload"
+    assert classify(scope("GET", "/api/uploads/abc")) == "public_read"
+    assert classify(scope("GET", "/api/gallery")) == "public_read"
+
+
+def test_waiters_are_admitted_in_arrival_order():
+    async def main():
+        limiter = Limiter(limit=1, queue_size=10, max_wait=5)
+        order = []
+
+        async def request(n):
+            await limiter.acquire()
+            order.append(n)
+            await asyncio.sleep(0.01)
+            limiter.release()
+
+        await limiter.acquire()
+        tasks = [asyncio.create_task(request(n)) for n in range(5)]
+        await asyncio.sleep(0.01)
+        assert limiter.snapshot()["queued"] == 5
+        limiter.release()
+        await asyncio.gather(*tasks)
+        assert order == [0, 1, 2, 3, 4]
+        assert limiter.active == 0
+        assert limiter.snapshot()["admitted"] == 6
+
+    asyncio.run(main())
+
+
+def test_full_queue_rejects_immediately():
+    async def main():
+        limiter = Limiter(limit=1, queue_size=1, max_wait=5)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        with pytest.raises(Rejected):
+            await limiter.acquire()
+        assert limiter.rejected_queue_full == 1
+        limiter.release()
+        await waiter
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(main())
+
+
+def test_deadline_rejects_and_leaves_the_queue():
+    async def main():
+        limiter = Limiter(limit=1, queue_size=5, max_wait=0.02)
+        await limiter.acquire()
+        with pytest.raises(Rejected):
+            await limiter.acquire()
+        assert limiter.rejected_deadline == 1
+        assert not limiter.waiting
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def main():
+        limiter = Limiter(limit=1, queue_size=5, max_wait=5)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        assert not limiter.waiting
+        limiter.release()
+        assert limiter.active == 0
+
+    asyncio.run(main())
+
+
+def test_waiter_cancelled_during_handoff_does_not_leak_the_slot():
+    async def main():
+        limiter = Limiter(limit=1, queue_size=5, max_wait=5)
+        await limiter.acquire()
+        waiter = asyncio.create_task(limiter.acquire())
+        await asyncio.sleep(0)
+        # The slot is handed over and the waiter cancelled in the same tick
+        limiter.release()
+        waiter.cancel()
+        try:
+            await waiter
+            # acquire() completed after all, so the caller owns the slot
+            limiter.release()
+        except asyncio.CancelledError:
+            pass
+        assert limiter.active == 0
+        await asyncio.wait_for(limiter.acquire(), 1)
+
+    asyncio.run(main())
@@ -0,0 +1,89 @@
+import asyncio
+
+import pytest
+
+from cache import SingleFlight, TTLCache
+
+
+def test_concurrent_calls_share_one_execution():
+    async def main():
+        flight = SingleFlight()
+        executions = 0
+
+        async def load():
+            nonlocal executions
+            executions += 1
+            await asyncio.sleep(0.01)
+            return "value"
+
+        results = await asyncio.gather(*(flight.do("gallery", load) for _ in range(10)))
+        assert results == ["value"] * 10
+        assert executions == 1
+        assert flight.snapshot()["gallery"] == {"calls": 10, "executions": 1, "coalesced": 9, "coalescing_ratio": 0.9}
+        # Once finished, the next call runs again
+        await flight.do("gallery", load)
+        assert executions == 2
+
+    asyncio.run(main())
+
+
+def test_exception_is_shared_and_not_cached():
+    async def main():
+        flight = SingleFlight()
+        calls = 0
+
+        async def fail():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.01)
+            raise RuntimeError("down")
+
+        results = await asyncio.gather(*(flight.do("k", fail) for _ in range(3)), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        assert calls == 1
+        with pytest.raises(RuntimeError):
+            await flight.do("k", fail)
+        assert calls == 2
+
+    asyncio.run(main())
+
+
+def test_cancelled_waiter_does_not_cancel_the_shared_call():
+    async def main():
+        flight = SingleFlight()
+
+        async def load():
+            await asyncio.sleep(0.02)
+            return 42
+
+        first = asyncio.create_task(flight.do("k", load))
+        second = asyncio.create_task(flight.do("k", load))
+        await asyncio.sleep(0)
+        first.cancel()
+        assert await second == 42
+
+    asyncio.run(main())
+
+
+def test_metric_groups_unbounded_keys():
+    async def main():
+        flight = SingleFlight()
+
+        async def load():
+            return True
+
+        for email in ("a@x.com", "b@x.com"):
+            await flight.do(email, load, metric="check_email")
+        assert list(flight.snapshot()) == ["check_email"]
+
+    asyncio.run(main())
+
+
+def test_stale_cache_write_is_dropped():
+    cache = TTLCache(ttl=60)
+    version = cache.version
+    cache.invalidate("gallery")
+    cache.set("gallery", "stale", version)
+    assert cache.get("gallery") is None
+    cache.set("gallery", "fresh", cache.version)
+    assert cache.get("gallery") == "fresh"
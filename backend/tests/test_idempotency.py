@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+from pymongo.errors import DuplicateKeyError
+from starlette.datastructures import FormData
+
+from idempotency import IdempotencyStore
+
+
+class FakeKeys:
+    """The few collection operations IdempotencyStore uses, in memory"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def insert_one(self, doc):
+        if doc["_id"] in self.docs:
+            raise DuplicateKeyError("duplicate key")
+        self.docs[doc["_id"]] = dict(doc)
+
+    async def find_one(self, query):
+        doc = self.docs.get(query["_id"])
+        return dict(doc) if doc else None
+
+    async def find_one_and_update(self, query, update):
+        doc = self.docs.get(query["_id"])
+        if doc and doc["status"] == query["status"] and doc["locked_until"] < query["locked_until"]["$lt"]:
+            doc.update(update["$set"])
+            return dict(doc)
+        return None
+
+    async def update_one(self, query, update):
+        self.docs[query["_id"]].update(update["$set"])
+
+    async def delete_one(self, query):
+        if self.docs.get(query["_id"], {}).get("status") == query["status"]:
+            del self.docs[query["_id"]]
+
+
+class FakeRequest:
+    def __init__(self, key, **fields):
+        self.headers = {"idempotency-key": key} if key else {}
+        self._form = FormData(list(fields.items()))
+
+    async def form(self):
+        return self._form
+
+
+def make_endpoint(store, outcome=None, delay=0):
+    calls = []
+
+    @store.guard("submit")
+    async def endpoint(request):
+        calls.append(request)
+        await asyncio.sleep(delay)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return {"status": "success"}
+
+    return endpoint, calls
+
+
+def new_store(wait_seconds=5):
+    keys = FakeKeys()
+    return IdempotencyStore(lambda: {"idempotency_keys": keys}, ttl_hours=1, wait_seconds=wait_seconds, lock_seconds=60)
+
+
+def test_retry_with_same_key_is_replayed():
+    async def main():
+        endpoint, calls = make_endpoint(new_store())
+        assert await endpoint(request=FakeRequest("k", email="a@x.com")) == {"status": "success"}
+        replayed = await endpoint(request=FakeRequest("k", email="a@x.com"))
+        assert replayed.status_code == 200
+        assert replayed.headers["Idempotent-Replayed"] == "true"
+        assert len(calls) == 1
+
+    asyncio.run(main())
+
+
+def test_requests_without_key_always_run():
+    async def main():
+        endpoint, calls = make_endpoint(new_store())
+        await endpoint(request=FakeRequest(None, email="a@x.com"))
+        await endpoint(request=FakeRequest(None, email="a@x.com"))
+        assert len(calls) == 2
+
+    asyncio.run(main())
+
+
+def test_concurrent_duplicates_run_once():
+    async def main():
+        endpoint, calls = make_endpoint(new_store(), delay=0.05)
+        results = await asyncio.gather(*(endpoint(request=FakeRequest("k", email="a@x.com")) for _ in range(3)))
+        assert len(calls) == 1
+        assert results[0] == {"status": "success"}
+        assert all(r.status_code == 200 for r in results[1:])
+
+    asyncio.run(main())
+
+
+def test_key_reused_for_different_request_is_rejected():
+    async def main():
+        endpoint, _ = make_endpoint(new_store())
+        await endpoint(request=FakeRequest("k", email="a@x.com"))
+        with pytest.raises(HTTPException) as e:
+            await endpoint(request=FakeRequest("k", email="b@x.com"))
+        assert e.value.status_code == 422
+
+    asyncio.run(main())
+
+
+def test_client_errors_are_stored_but_server_errors_release_the_key():
+    async def main():
+        store = new_store()
+        rejected, calls = make_endpoint(store, HTTPException(status_code=400, detail="already registered"))
+        with pytest.raises(HTTPException):
+            await rejected(request=FakeRequest("a", email="a@x.com"))
+        replayed = await rejected(request=FakeRequest("a", email="a@x.com"))
+        assert replayed.status_code == 400
+        assert len(calls) == 1
+
+        failing, calls = make_endpoint(store, HTTPException(status_code=503, detail="busy"))
+        for _ in range(2):
+            with pytest.raises(HTTPException):
+                await failing(request=FakeRequest("b", email="a@x.com"))
+        assert len(calls) == 2
+
+    asyncio.run(main())
+
+
+def test_duplicate_gives_up_with_409_while_first_is_running():
+    async def main():
+        endpoint, _ = make_endpoint(new_store(wait_seconds=0.05), delay=0.5)
+        first = asyncio.create_task(endpoint(request=FakeRequest("k", email="a@x.com")))
+        await asyncio.sleep(0.01)
+        with pytest.raises(HTTPException) as e:
+            await endpoint(request=FakeRequest("k", email="a@x.com"))
+        assert e.value.status_code == 409
+        await first
+
+    asyncio.run(main())
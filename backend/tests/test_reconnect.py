@@ -0,0 +1,69 @@
+import asyncio
+
+import pytest
+
+import reconnect
+from reconnect import RETRY_MAX_SECONDS, reconnect_forever
+
+
+class Stop(BaseException):
+    pass
+
+
+def run_until_stopped(follow, on_error=None, monkeypatch=None):
+    delays = []
+
+    async def sleep(delay):
+        delays.append(delay)
+
+    monkeypatch.setattr(reconnect.asyncio, "sleep", sleep)
+    with pytest.raises(Stop):
+        asyncio.run(reconnect_forever(follow, "test", on_error))
+    return delays
+
+
+def test_failures_back_off_exponentially_up_to_the_cap(monkeypatch):
+    attempts = []
+
+    async def follow(connected):
+        attempts.append(1)
+        if len(attempts) > 7:
+            raise Stop
+        raise ConnectionError("down")
+
+    delays = run_until_stopped(follow, monkeypatch=monkeypatch)
+    assert delays == [1, 2, 4, 8, 16, RETRY_MAX_SECONDS, RETRY_MAX_SECONDS]
+
+
+def test_connecting_resets_the_delay_and_errors_are_reported(monkeypatch):
+    attempts, errors = [], []
+
+    async def follow(connected):
+        attempts.append(1)
+        if len(attempts) == 3:
+            connected()
+        if len(attempts) > 4:
+            raise Stop
+        raise ConnectionError(len(attempts))
+
+    delays = run_until_stopped(follow, errors.append, monkeypatch)
+    assert delays == [1, 2, 1, 2]
+    assert [e.args[0] for e in errors] == [1, 2, 3, 4]
+
+
+def test_cancellation_is_not_retried():
+    started = []
+
+    async def follow(connected):
+        started.append(1)
+        await asyncio.Event().wait()
+
+    async def main():
+        task = asyncio.create_task(reconnect_forever(follow, "test"))
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert started == [1]
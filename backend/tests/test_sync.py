@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pymongo
+from pymongo import _csot
+
+from sync import SETTLE_SECONDS, WRITE_SECONDS, changes_since, is_settled, settled_cursor, write_budget
+
+OLD = datetime.now(timezone.utc) - timedelta(seconds=SETTLE_SECONDS * 2)
+
+
+def fresh():
+    return datetime.now(timezone.utc)
+
+
+class FakeCursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, key, direction):
+        self.docs = sorted(self.docs, key=lambda doc: doc[key], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length):
+        return self.docs[:length]
+
+
+class FakeCollection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, query, **options):
+        since = query["seq"]["$gt"]
+        return FakeCursor([doc for doc in self.docs if doc["seq"] > since
+                           and all(doc.get(k) == v for k, v in query.items() if k != "seq")])
+
+
+class FakeDb:
+    def __init__(self, records, tombstones=()):
+        self.collections = {"records": FakeCollection(list(records)), "tombstones": FakeCollection(list(tombstones))}
+
+    def __getitem__(self, name):
+        return self.collections[name]
+
+    @property
+    def tombstones(self):
+        return self.collections["tombstones"]
+
+
+def test_is_settled_accepts_naive_and_missing_timestamps():
+    assert is_settled(None)
+    assert is_settled(OLD.replace(tzinfo=None))
+    assert not is_settled(fresh())
+
+
+def test_write_budget_stays_inside_the_settle_window():
+    assert WRITE_SECONDS < SETTLE_SECONDS
+    # However long the request's own budget, the seq reservation and write get WRITE_SECONDS
+    with pymongo.timeout(SETTLE_SECONDS * 10), write_budget():
+        assert _csot.remaining() <= WRITE_SECONDS
+
+
+def test_settled_cursor_stops_at_first_unsettled_change():
+    docs = [{"seq": 3, "updated_at": OLD}, {"seq": 4, "updated_at": fresh()}, {"seq": 5, "updated_at": OLD}]
+    assert settled_cursor(docs, since=2) == 3
+    assert settled_cursor(docs[1:], since=3) == 3
+    assert settled_cursor([], since=7) == 7
+
+
+def test_changes_since_merges_tombstones_in_seq_order():
+    db = FakeDb([{"id": "a", "seq": 1, "updated_at": OLD}, {"id": "c", "seq": 3, "updated_at": OLD}],
+                [{"collection": "records", "id": "b", "seq": 2, "updated_at": OLD}])
+    changed, deleted, cursor, more = asyncio.run(changes_since(db, "records", 0, 2))
+    assert [doc["id"] for doc in changed] == ["a"]
+    assert deleted == ["b"]
+    assert (cursor, more) == (2, True)
+
+    changed, deleted, cursor, more = asyncio.run(changes_since(db, "records", cursor, 2))
+    assert [doc["id"] for doc in changed] == ["c"]
+    assert (deleted, cursor, more) == ([], 3, False)
+
+
+def test_changes_since_does_not_ask_for_more_when_page_is_unsettled():
+    db = FakeDb([{"id": "a", "seq": 1, "updated_at": OLD}, {"id": "b", "seq": 2, "updated_at": fresh()},
+                 {"id": "c", "seq": 3, "updated_at": OLD}])
+    changed, deleted, cursor, more = asyncio.run(changes_since(db, "records", 0, 2))
+    assert [doc["id"] for doc in changed] == ["a", "b"]
+    assert (cursor, more) == (1, False)
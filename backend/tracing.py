@@ -0,0 +1,110 @@
+"""OpenTelemetry tracing for the WHIBC API.
+
+TRACING_EXPORTER selects where spans go:
+  none  (default) spans are no-ops
+  otlp  OTLP/HTTP to a local collector (OTEL_EXPORTER_OTLP_ENDPOINT, default http://localhost:4318)
+  jsonl one JSON span per line in TRACING_JSONL_PATH
+"""
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+
+from opentelemetry import propagate, trace
+
+TRACING_EXPORTER = os.environ.get('TRACING_EXPORTER', 'none')
+TRACING_JSONL_PATH = os.environ.get('TRACING_JSONL_PATH', 'traces.jsonl')
+
+logger = logging.getLogger(__name__)
+tracer = trace.get_tracer("whibc-api")
+_provider = None
+
+
+def configure_tracing():
+    global _provider
+    if TRACING_EXPORTER == 'none' or _provider is not None:
+        return
+    from opentelemetry.sdk.resources import Resource
+    from opentelemetry.sdk.trace import TracerProvider
+    from opentelemetry.sdk.trace.export import BatchSpanProcessor
+
+    if TRACING_EXPORTER == 'otlp':
+        from opentelemetry.exporter.otlp.proto.http.trace_exporter import OTLPSpanExporter
+        exporter = OTLPSpanExporter()
+    elif TRACING_EXPORTER == 'jsonl':
+        exporter = JsonlSpanExporter(TRACING_JSONL_PATH)
+    else:
+        logger.warning("Unknown TRACING_EXPORTER %r; tracing disabled", TRACING_EXPORTER)
+        return
+    _provider = TracerProvider(resource=Resource.create({"service.name": "whibc-api"}))
+    _provider.add_span_processor(BatchSpanProcessor(exporter))
+    trace.set_tracer_provider(_provider)
+
+
+def shutdown_tracing():
+    if _provider is not None:
+        _provider.shutdown()
+
+
+class JsonlSpanExporter:
+    """Appends finished spans to a file, one JSON object per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+
+    def export(self, spans):
+        from opentelemetry.sdk.trace.export import SpanExportResult
+        lines = "".join(json.dumps(json.loads(span.to_json(indent=None))) + "\n" for span in spans)
+        with self._lock, open(self.path, "a", encoding="utf-8") as f:
+            f.write(lines)
+        return SpanExportResult.SUCCESS
+
+    def shutdown(self):
+        pass
+
+    def force_flush(self, timeout_millis: int = 30000) -> bool:
+        return True
+
+
+def current_trace_id() -> Optional[str]:
+    context = trace.get_current_span().get_span_context()
+    return format(context.trace_id, "032x") if context.is_valid else None
+
+
+def span_since(name: str, start_ns: int, **attributes):
+    """Record a span that already finished, e.g. request body parsing before the handler ran"""
+    tracer.start_span(name, start_time=start_ns, attributes=attributes).end()
+
+
+class TracingMiddleware:
+    """ASGI middleware opening a server span per request and echoing its id as X-Trace-Id"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        carrier = {key.decode("latin-1"): value.decode("latin-1") for key, value in scope["headers"]}
+        scope.setdefault("state", {})["request_start_ns"] = time.time_ns()
+        with tracer.start_as_current_span(
+            f"{scope['method']} {scope['path']}",
+            context=propagate.extract(carrier),
+            kind=trace.SpanKind.SERVER,
+            attributes={"http.method": scope["method"], "http.target": scope["path"]},
+        ) as span:
+            trace_id = current_trace_id()
+
+            async def send_with_trace_id(message):
+                if message["type"] == "http.response.start":
+                    span.set_attribute("http.status_code", message["status"])
+                    if trace_id:
+                        message.setdefault("headers", [])
+                        message["headers"] = list(message["headers"]) + [(b"x-trace-id", trace_id.encode())]
+                await send(message)
+
+            await self.app(scope, receive, send_with_trace_id)
@@ -1,4 +1,4 @@
-import React, { useState, useEffect } from 'react';
+import React, { useState, useEffect, useRef } from 'react';
 import { Users, Handshake, Images, Calendar, Download, Mail, Phone, MapPin, FileText, Eye, ChevronDown, ChevronUp, LogOut } from 'lucide-react';
 import AdminLogin from './AdminLogin';
 import AdminGallery from './AdminGallery';
@@ -13,6 +13,8 @@ const AdminPage = () => {
   const [activeTab, setActiveTab] = useState('dashboard');
   const [loading, setLoading] = useState(true);
   const [expandedItems, setExpandedItems] = useState({});
+  // Delta-sync cursor per list; absent means the next fetch downloads the whole list
+  const syncCursors = useRef({});
 
   const backendUrl = process.env.REACT_APP_BACKEND_URL;
 
@@ -22,12 +24,76 @@ const AdminPage = () => {
 
   useEffect(() => {
     if (isAuthenticated) {
-      fetchDashboardData();
-      fetchRegistrations();
-      fetchPartnerships();
+      fetchAdminData();
     }
   }, [isAuthenticated]);
 
+  // Live updates instead of polling. EventSource cannot send headers and its URL ends up in
+  // access logs, so it opens with a short-lived ticket rather than the admin token
+  useEffect(() => {
+    if (!isAuthenticated) return;
+    const setters = { student_registrations: setRegistrations, partnerships: setPartnerships };
+    const refetchers = { student_registrations: fetchRegistrations, partnerships: fetchPartnerships };
+    let source = null;
+    let retryTimer = null;
+    let stopped = false;
+
+    const handleChange = (event) => {
+      const change = JSON.parse(event.data);
+      fetchDashboardData();
+      if (change.type === 'insert' && change.document && setters[change.collection]) {
+        // The record may already be listed (fetched after the stream opened, or by a resync)
+        setters[change.collection](prev => [change.document, ...prev.filter(item => item.id !== change.document.id)]
+          .sort((a, b) => new Date(b.created_at) - new Date(a.created_at)));
+      } else if (refetchers[change.collection]) {
+        refetchers[change.collection]();
+      }
+    };
+    const handleResync = () => {
+      syncCursors.current = {};
+      fetchAdminData();
+    };
+    const reconnect = () => {
+      if (!stopped) retryTimer = setTimeout(() => connect(true), 5000);
+    };
+
+    const connect = async (reconnecting) => {
+      try {
+        const response = await fetch(`${backendUrl}/api/admin/events/ticket`, {
+          method: 'POST',
+          headers: getAuthHeaders(),
+        });
+        if (response.status === 401) {
+          handleLogout();
+          return;
+        }
+        if (!response.ok) throw new Error(`Ticket request failed with ${response.status}`);
+        const { ticket } = await response.json();
+        if (stopped) return;
+        source = new EventSource(`${backendUrl}/api/admin/events?ticket=${encodeURIComponent(ticket)}`);
+        ['insert', 'update', 'replace', 'delete'].forEach(type => source.addEventListener(type, handleChange));
+        source.addEventListener('resync', handleResync);
+        // Changes made while we were disconnected were not streamed
+        if (reconnecting) source.addEventListener('ready', handleResync, { once: true });
+        source.onerror = () => {
+          // The browser would retry with the same, by then expired, ticket
+          source.close();
+          reconnect();
+        };
+      } catch (error) {
+        console.error('Error connecting to live updates:', error);
+        reconnect();
+      }
+    };
+
+    connect(false);
+    return () => {
+      stopped = true;
+      clearTimeout(retryTimer);
+      if (source) source.close();
+    };
+  }, [isAuthenticated]);
+
   const checkAuthentication = async () => {
     const token = localStorage.getItem('admin_token');
     const storedAdminInfo = localStorage.getItem('admin_info');
@@ -100,17 +166,78 @@ const AdminPage = () => {
     }
   };
 
-  const fetchRegistrations = async () => {
+  const syncQuery = (path) => {
+    const cursor = syncCursors.current[path];
+    return { id: path, path: `/api/${path}`, params: cursor === undefined ? {} : { since: cursor } };
+  };
+
+  // Full list on the first call, then only what changed since the last cursor
+  const applySync = (path, setList, data, nextCursor) => {
+    const cursor = syncCursors.current[path];
+    if (cursor === undefined) {
+      setList(data);
+      if (nextCursor != null) syncCursors.current[path] = Number(nextCursor);
+      return false;
+    }
+    const replaced = new Set([...data.deleted, ...data.changes.map(item => item.id)]);
+    setList(prev => [...data.changes, ...prev.filter(item => !replaced.has(item.id))]
+      .sort((a, b) => new Date(b.created_at) - new Date(a.created_at)));
+    syncCursors.current[path] = data.cursor;
+    // Only page on while the cursor moves; recent changes are picked up on the next sync
+    return data.more && data.cursor !== cursor;
+  };
+
+  const syncList = async (path, setList) => {
+    const { params } = syncQuery(path);
+    const query = params.since === undefined ? '' : `?since=${params.since}`;
+    const response = await fetch(`${backendUrl}/api/${path}${query}`, {
+      headers: getAuthHeaders(),
+    });
+    if (response.status === 401) {
+      handleLogout();
+      return;
+    }
+    if (!response.ok) return;
+    const more = applySync(path, setList, await response.json(), response.headers.get('X-Sync-Cursor'));
+    if (more) await syncList(path, setList);
+  };
+
+  // Dashboard and both lists in one round trip
+  const fetchAdminData = async () => {
+    const lists = { registrations: setRegistrations, partnerships: setPartnerships };
     try {
-      const response = await fetch(`${backendUrl}/api/registrations`, {
+      const response = await fetch(`${backendUrl}/api/admin/batch`, {
+        method: 'POST',
         headers: getAuthHeaders(),
+        body: JSON.stringify({
+          queries: [{ id: 'dashboard', path: '/api/admin/dashboard' }, ...Object.keys(lists).map(syncQuery)],
+        }),
       });
-      if (response.ok) {
-        const data = await response.json();
-        setRegistrations(data);
-      } else if (response.status === 401) {
+      if (response.status === 401) {
         handleLogout();
+        return;
+      }
+      if (!response.ok) return;
+      const { results } = await response.json();
+      for (const result of results) {
+        if (result.status !== 200) {
+          console.error(`Error fetching ${result.id}:`, result.body);
+        } else if (result.id === 'dashboard') {
+          setDashboardData(result.body);
+        } else if (applySync(result.id, lists[result.id], result.body, result.headers['x-sync-cursor'])) {
+          await syncList(result.id, lists[result.id]);
+        }
       }
+    } catch (error) {
+      console.error('Error fetching admin data:', error);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const fetchRegistrations = async () => {
+    try {
+      await syncList('registrations', setRegistrations);
     } catch (error) {
       console.error('Error fetching registrations:', error);
     } finally {
@@ -120,15 +247,7 @@ const AdminPage = () => {
 
   const fetchPartnerships = async () => {
     try {
-      const response = await fetch(`${backendUrl}/api/partnerships`, {
-        headers: getAuthHeaders(),
-      });
-      if (response.ok) {
-        const data = await response.json();
-        setPartnerships(data);
-      } else if (response.status === 401) {
-        handleLogout();
-      }
+      await syncList('partnerships', setPartnerships);
     } catch (error) {
       console.error('Error fetching partnerships:', error);
     }